@@ -0,0 +1,10 @@
+"""Нагрузочное тестирование запущенного сервиса.
+
+Пакет не зависит от Django и сторонних библиотек: запросы отправляет
+собственный HTTP/1.1 клиент на asyncio. Запуск из корня репозитория
+против docker-compose::
+
+    python -m loadtest run --base-url http://localhost --rps 50 \\
+        --duration 60 --username admin --password admin --output new.json
+    python -m loadtest compare base.json new.json --tolerance 0.1
+"""
@@ -0,0 +1,134 @@
+"""Командная строка: python -m loadtest run|compare."""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+from .client import HTTPClient
+from .report import build_report, compare
+from .runner import run_load
+from .scenarios import discover, parse_mix
+
+
+async def obtain_token(client, username, password):
+    response = await client.request(
+        "POST", "/auth/", {"username": username, "password": password}
+    )
+    if response.status != 200:
+        raise SystemExit(
+            f"Не удалось получить токен: {response.status} {response.body!r}"
+        )
+    return response.json()["token"]
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    if mix.get("auth") and not (args.username and args.password):
+        raise SystemExit("Сценарию auth нужны --username и --password")
+    client = HTTPClient(args.base_url, max_connections=args.connections)
+    try:
+        token = args.token or await obtain_token(
+            client, args.username, args.password
+        )
+        client.headers["Authorization"] = f"Token {token}"
+        data = await discover(client)
+        data["username"] = args.username
+        data["password"] = args.password
+        if args.warmup:
+            await run_load(
+                client,
+                data,
+                mix,
+                args.rps,
+                args.warmup,
+                args.timeout,
+                args.seed + 1,
+            )
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        stats, elapsed = await run_load(
+            client, data, mix, args.rps, args.duration, args.timeout, args.seed
+        )
+    finally:
+        await client.close()
+    return build_report(
+        stats,
+        elapsed,
+        {
+            "base_url": args.base_url,
+            "started_at": started_at,
+            "target_rps": args.rps,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "connections": args.connections,
+            "timeout_s": args.timeout,
+            "seed": args.seed,
+            "mix": mix,
+        },
+    )
+
+
+def write(result, path):
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="нагрузить сервис")
+    run_parser.add_argument("--base-url", default="http://localhost")
+    run_parser.add_argument("--rps", type=float, default=20)
+    run_parser.add_argument("--duration", type=float, default=60)
+    run_parser.add_argument("--warmup", type=float, default=5)
+    run_parser.add_argument("--connections", type=int, default=100)
+    run_parser.add_argument("--timeout", type=float, default=10)
+    run_parser.add_argument(
+        "--mix",
+        help="веса сценариев, например district_list=50,catalog=50",
+    )
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--token", default=os.getenv("LOADTEST_TOKEN"))
+    run_parser.add_argument(
+        "--username", default=os.getenv("LOADTEST_USERNAME")
+    )
+    run_parser.add_argument(
+        "--password", default=os.getenv("LOADTEST_PASSWORD")
+    )
+    run_parser.add_argument("--output")
+
+    compare_parser = commands.add_parser(
+        "compare", help="сравнить два отчета"
+    )
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1)
+    compare_parser.add_argument(
+        "--error-tolerance", type=float, default=0.01
+    )
+    compare_parser.add_argument("--output")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        if not args.token and not (args.username and args.password):
+            parser.error("нужен --token или --username и --password")
+        write(asyncio.run(run(args)), args.output)
+        return
+    reports = []
+    for path in (args.base, args.new):
+        with open(path, encoding="utf-8") as file:
+            reports.append(json.load(file))
+    result = compare(*reports, args.tolerance, args.error_tolerance)
+    write(result, args.output)
+    if result["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Минимальный HTTP/1.1 клиент на asyncio с пулом keep-alive соединений."""
+import asyncio
+import json
+import ssl
+from urllib.parse import urlsplit
+
+
+class HTTPError(Exception):
+    """Сервер вернул ответ, который не удалось разобрать."""
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class HTTPClient:
+    """Клиент одного сервера с не более чем max_connections соединениями.
+
+    Запросы сверх лимита ждут свободного соединения, и это ожидание
+    входит в их задержку, как и у настоящих клиентов.
+    """
+
+    def __init__(self, base_url, max_connections=100, headers=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.ssl = None
+        if parts.scheme == "https":
+            self.ssl = ssl.create_default_context()
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.host_header = parts.netloc
+        self.headers = dict(headers or {})
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.idle = []
+
+    async def request(self, method, path, data=None, headers=None):
+        body = b"" if data is None else json.dumps(data).encode()
+        head = {
+            "Host": self.host_header,
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+            "Content-Length": str(len(body)),
+            **self.headers,
+            **(headers or {}),
+        }
+        if data is not None:
+            head["Content-Type"] = "application/json"
+        message = (
+            f"{method} {self.prefix}{path} HTTP/1.1\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in head.items())
+            + "\r\n"
+        ).encode() + body
+        async with self.semaphore:
+            # Сервер мог закрыть простаивавшее соединение: такой запрос
+            # повторяется один раз на новом соединении.
+            reused = bool(self.idle)
+            try:
+                return await self.exchange(message, method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not reused:
+                    raise
+                return await self.exchange(message, method, fresh=True)
+
+    async def exchange(self, message, method, fresh=False):
+        if self.idle and not fresh:
+            reader, writer = self.idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl
+            )
+        try:
+            writer.write(message)
+            await writer.drain()
+            response, keep_alive = await read_response(reader, method)
+        except BaseException:
+            writer.close()
+            raise
+        if keep_alive:
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+        return response
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+async def read_response(reader, method):
+    status_line = await reader.readuntil(b"\r\n")
+    try:
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        status = int(status)
+    except ValueError:
+        raise HTTPError(f"Некорректная строка статуса: {status_line!r}")
+    headers = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        body = b""
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        body = await read_chunked(reader)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" and version == "HTTP/1.1"
+    return Response(status, headers, body), keep_alive
+
+
+async def read_chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+        if size == 0:
+            # Завершающие заголовки не нужны, читаем до пустой строки.
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            return b"".join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
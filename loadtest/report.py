@@ -0,0 +1,111 @@
+"""Сводка прогона и сравнение двух отчетов."""
+from collections import Counter
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round((len(values) - 1) * fraction)]
+
+
+class Stats:
+    """Задержки, статусы и ошибки одного сценария."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def add(self, latency, status=None, error=None):
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] += 1
+        else:
+            self.statuses[str(status)] += 1
+            if status >= 400:
+                self.errors[f"HTTP {status}"] += 1
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        if not count:
+            return {"requests": 0}
+        latencies = [latency * 1000 for latency in self.latencies]
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2),
+            "error_rate": round(sum(self.errors.values()) / count, 4),
+            **{
+                metric: round(percentile(latencies, fraction), 2)
+                for metric, fraction in zip(
+                    LATENCY_METRICS, (0.5, 0.95, 0.99)
+                )
+            },
+            "max_ms": round(max(latencies), 2),
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+        }
+
+
+def build_report(stats, elapsed, settings):
+    total = Stats()
+    for item in stats.values():
+        total.merge(item)
+    return {
+        "settings": settings,
+        "elapsed_s": round(elapsed, 2),
+        "total": total.summary(elapsed),
+        "scenarios": {
+            name: item.summary(elapsed) for name, item in sorted(stats.items())
+        },
+    }
+
+
+def compare(base, new, tolerance, error_tolerance=0.01):
+    """Изменения метрик new относительно base и список регрессий.
+
+    Регрессия - перцентиль задержки, выросший больше чем на tolerance,
+    пропускная способность, упавшая больше чем на tolerance (обе -
+    относительно base), или доля ошибок, выросшая больше чем на
+    error_tolerance в абсолютных единицах: относительный рост доли ошибок
+    с нуля не определен, а с 0.1% до 0.2% - шум.
+    """
+    rows = {}
+    regressions = []
+    names = ["total", *sorted(set(base["scenarios"]) & set(new["scenarios"]))]
+    for name in names:
+        old = base["total"] if name == "total" else base["scenarios"][name]
+        current = new["total"] if name == "total" else new["scenarios"][name]
+        if not old.get("requests") or not current.get("requests"):
+            continue
+        row = {}
+        for metric in (*LATENCY_METRICS, "throughput_rps", "error_rate"):
+            change = None
+            if old[metric]:
+                change = (current[metric] - old[metric]) / old[metric]
+                change = round(change, 4)
+            row[metric] = {
+                "base": old[metric],
+                "new": current[metric],
+                "change": change,
+            }
+            if metric in LATENCY_METRICS:
+                regressed = change is not None and change > tolerance
+            elif metric == "error_rate":
+                regressed = current[metric] - old[metric] > error_tolerance
+            else:
+                regressed = change is not None and change < -tolerance
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+        rows[name] = row
+    return {
+        "tolerance": tolerance,
+        "error_tolerance": error_tolerance,
+        "metrics": rows,
+        "regressions": regressions,
+    }
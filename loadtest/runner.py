@@ -0,0 +1,52 @@
+"""Открытая модель нагрузки: запросы уходят по расписанию target RPS.
+
+Очередной запрос отправляется в назначенное время независимо от того,
+ответил ли сервер на предыдущие, а задержка считается от назначенного
+времени. Поэтому перегруженный сервис получает рост задержек, а не
+незаметное снижение нагрузки, как при замкнутом цикле клиентов.
+"""
+import asyncio
+import random
+from collections import defaultdict
+
+from .report import Stats
+from .scenarios import SCENARIOS
+
+
+async def execute(name, client, data, rng, intended, timeout, stats):
+    loop = asyncio.get_running_loop()
+    try:
+        response = await asyncio.wait_for(
+            SCENARIOS[name](client, data, rng), timeout
+        )
+    except asyncio.TimeoutError:
+        stats[name].add(loop.time() - intended, error="timeout")
+    except Exception as error:
+        stats[name].add(loop.time() - intended, error=type(error).__name__)
+    else:
+        stats[name].add(loop.time() - intended, status=response.status)
+
+
+async def run_load(client, data, mix, rps, duration, timeout, seed=0):
+    """Выполняет rps * duration запросов смеси mix, возвращает статистику."""
+    rng = random.Random(seed)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    stats = defaultdict(Stats)
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    start = loop.time()
+    for number in range(int(rps * duration)):
+        intended = start + number / rps
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        (name,) = rng.choices(names, weights)
+        task = asyncio.create_task(
+            execute(name, client, data, rng, intended, timeout, stats)
+        )
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return stats, loop.time() - start
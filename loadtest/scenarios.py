@@ -0,0 +1,158 @@
+"""Сценарии нагрузки и данные, на которых они работают.
+
+Каждый сценарий - корутина (client, data, rng), которая выполняет один
+запрос и возвращает Response. data собирается discover() перед прогоном
+из самого сервиса, поэтому сценарии не зависят от содержимого базы.
+Записи меняют только цены уже существующих предприятий, так что объем
+данных между прогонами не растет.
+"""
+from urllib.parse import urlencode
+
+DEFAULT_MIX = {
+    "district_list": 35,
+    "district_filtered": 25,
+    "catalog": 20,
+    "organization_detail": 10,
+    "organization_write": 4,
+    "price_update": 4,
+    "auth": 2,
+}
+PAGE_SIZE = 20
+
+
+def results(payload):
+    """Список объектов из ответа с пагинацией или без нее."""
+    return payload["results"] if isinstance(payload, dict) else payload
+
+
+async def discover(client):
+    """Справочники и предприятия, по которым будут ходить сценарии."""
+    data = {}
+    for name, path in (
+        ("districts", "/districts/"),
+        ("categories", "/categories/"),
+        ("networks", "/networks/"),
+        ("products", "/products/?page_size=200"),
+        ("organizations", "/organizations_all/?page_size=100"),
+    ):
+        response = await client.request("GET", path)
+        if response.status != 200:
+            raise RuntimeError(f"GET {path}: статус {response.status}")
+        data[name] = results(response.json())
+    if not data["districts"] or not data["organizations"]:
+        raise RuntimeError("Для нагрузки нужны районы и предприятия")
+    return data
+
+
+async def district_list(client, data, rng):
+    district = rng.choice(data["districts"])["id"]
+    return await client.request(
+        "GET", f"/organizations/{district}/?page_size={PAGE_SIZE}"
+    )
+
+
+async def district_filtered(client, data, rng):
+    district = rng.choice(data["districts"])["id"]
+    query = {"page_size": PAGE_SIZE}
+    kind = rng.choice(("categories", "search", "price"))
+    if kind == "categories" and data["categories"]:
+        query["categories"] = rng.choice(data["categories"])["name"]
+    elif kind == "search" and data["products"]:
+        query["search"] = rng.choice(data["products"])["name"][:4]
+    else:
+        query["max_price"] = rng.randint(100, 5000)
+        query["ordering"] = "min_price"
+    return await client.request(
+        "GET", f"/organizations/{district}/?{urlencode(query)}"
+    )
+
+
+async def catalog(client, data, rng):
+    path = rng.choice(
+        (
+            "/categories/",
+            "/districts/",
+            "/networks/",
+            f"/products/?page_size={PAGE_SIZE}",
+        )
+    )
+    return await client.request("GET", path)
+
+
+async def organization_detail(client, data, rng):
+    organization = rng.choice(data["organizations"])["id"]
+    return await client.request("GET", f"/organizations_all/{organization}/")
+
+
+async def organization_write(client, data, rng):
+    """PATCH предприятия с прежними товарами и новыми ценами."""
+    organization = rng.choice(data["organizations"])
+    products = [
+        {"id": product["id"], "price": rng.randint(0, 10000)}
+        for product in organization["product"]
+    ]
+    return await client.request(
+        "PATCH",
+        f"/organizations_all/{organization['id']}/",
+        {"product": products},
+    )
+
+
+async def price_update(client, data, rng):
+    rows = [
+        (organization["id"], product["id"])
+        for organization in rng.sample(
+            data["organizations"], min(10, len(data["organizations"]))
+        )
+        for product in organization["product"]
+    ]
+    return await client.request(
+        "POST",
+        "/organizations_prices/",
+        [
+            {
+                "organization": organization,
+                "product": product,
+                "price": rng.randint(0, 10000),
+            }
+            for organization, product in rows[:500]
+        ],
+    )
+
+
+async def auth(client, data, rng):
+    return await client.request(
+        "POST",
+        "/auth/",
+        {"username": data["username"], "password": data["password"]},
+    )
+
+
+SCENARIOS = {
+    "district_list": district_list,
+    "district_filtered": district_filtered,
+    "catalog": catalog,
+    "organization_detail": organization_detail,
+    "organization_write": organization_write,
+    "price_update": price_update,
+    "auth": auth,
+}
+
+
+def parse_mix(value):
+    """Смесь вида "district_list=50,catalog=30" поверх DEFAULT_MIX.
+
+    Сценарии, не упомянутые в value, выключаются.
+    """
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"Неизвестный сценарий {name!r}, есть: {', '.join(SCENARIOS)}"
+            )
+        mix[name] = float(weight or 1)
+    return mix
@@ -0,0 +1,152 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from rest_framework.response import Response
+
+from .cache import CachedResponseMixin
+from .conditional import ConditionalRequestMixin
+from .db_json import DatabaseJSONMixin
+from .metrics import count_cache
+
+
+class AsyncReadMixin:
+    """Асинхронные list и retrieve для вьюсетов.
+
+    Под ASGI воркер не блокируется на время запросов к БД: выборки идут
+    через асинхронный ORM (aget, async for), а ответы 304 и ответы из кеша
+    отдаются без обращения к БД. Шаги DRF, которые ходят в БД синхронно
+    (аутентификация, django-filter, курсорная пагинация), выполняются в
+    sync_to_async. Остальные действия вьюсета работают как раньше, в
+    отдельном потоке.
+    """
+
+    async_actions = ("list", "retrieve")
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+
+        @functools.wraps(sync_view)
+        async def view(request, *args, **kwargs):
+            if "get" in actions and "head" not in actions:
+                actions["head"] = actions["get"]
+            if actions.get(request.method.lower()) not in cls.async_actions:
+                return await sync_to_async(sync_view)(
+                    request, *args, **kwargs
+                )
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Асинхронный аналог APIView.dispatch."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aread(self.alist_objects, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aread(
+            self.aretrieve_object, request, *args, **kwargs
+        )
+
+    async def aread(self, handler, request, *args, **kwargs):
+        """Оборачивает handler так же, как list/retrieve миксинов."""
+        if isinstance(self, CachedResponseMixin):
+            handler = functools.partial(self.acached_response, handler)
+        if isinstance(self, ConditionalRequestMixin):
+            handler = functools.partial(self.aconditional_response, handler)
+        return await handler(request, *args, **kwargs)
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        response = await sync_to_async(self.get_conditional_response)(
+            request
+        )
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+        return self.set_validators(response)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return await handler(request, *args, **kwargs)
+        key = await sync_to_async(self.get_cache_key)(request)
+        cached = await cache.aget(key)
+        count_cache("response", cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = await handler(request, *args, **kwargs)
+        return self.store_response(key, response)
+
+    def renders_in_database(self, request):
+        return isinstance(self, DatabaseJSONMixin) and (
+            DatabaseJSONMixin.use_db_rendering(self, request)
+        )
+
+    async def alist_objects(self, request, *args, **kwargs):
+        if self.renders_in_database(request):
+            return await sync_to_async(DatabaseJSONMixin.list)(
+                self, request, *args, **kwargs
+            )
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        objects = [item async for item in queryset]
+        return Response(self.get_serializer(objects, many=True).data)
+
+    async def aretrieve_object(self, request, *args, **kwargs):
+        if self.renders_in_database(request):
+            return await sync_to_async(DatabaseJSONMixin.retrieve)(
+                self, request, *args, **kwargs
+            )
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        """Асинхронный аналог GenericAPIView.get_object."""
+        queryset = await sync_to_async(self.filter_queryset)(
+            self.get_queryset()
+        )
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
@@ -0,0 +1,104 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import bump, get_stamps
+from .metrics import count_cache
+
+TOKEN_KEY = "api:token:{}"
+
+
+def token_digest(key):
+    """Ключ токена не попадает в имена ключей кеша в открытом виде."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_scope(key):
+    return f"token:{token_digest(key)}"
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает закешированных пользователей токенов после фиксации."""
+    scopes = [token_scope(key) for key in keys]
+    if scopes:
+        transaction.on_commit(lambda: bump(*scopes))
+
+
+class TokenCache:
+    """Потокобезопасный LRU-кеш с ограничением времени жизни записей."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.ttl)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = TokenCache(
+    settings.API_TOKEN_CACHE_SIZE, settings.API_TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД на каждый вызов API.
+
+    Пользователь токена хранится в LRU-кеше процесса, а при
+    API_TOKEN_CACHE_SHARED еще и в общем кеше Django, откуда его берут
+    остальные воркеры. Каждая запись помнит метку версии токена: удаление
+    токена или изменение пользователя сбрасывает метку (api.signals), и
+    запись перестает совпадать во всех процессах сразу.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        # Метка читается до БД: изменение, зафиксированное после чтения,
+        # сменит ее и не даст закрепить устаревшего пользователя.
+        (stamp,) = get_stamps(token_scope(key))
+        cached = token_cache.get(digest)
+        if cached is None and settings.API_TOKEN_CACHE_SHARED:
+            cached = cache.get(TOKEN_KEY.format(digest))
+            if cached is not None:
+                token_cache.set(digest, cached)
+        hit = cached is not None and cached[0] == stamp
+        count_cache("token", hit)
+        if hit:
+            _, user, token = cached
+            return copy.copy(user), token
+        user, token = super().authenticate_credentials(key)
+        cached = (stamp, user, token)
+        token_cache.set(digest, cached)
+        if settings.API_TOKEN_CACHE_SHARED:
+            cache.set(
+                TOKEN_KEY.format(digest), cached, settings.API_TOKEN_CACHE_TTL
+            )
+        return copy.copy(user), token
@@ -0,0 +1,224 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    OrganizationDistrict,
+    Product,
+)
+
+from .metrics import count_cache
+
+# Меняется вместе с форматом ответа OrganizationSerializer, чтобы после
+# выкладки не отдавались ответы, сохраненные старой версией кода.
+SERIALIZER_VERSION = 1
+
+STAMP_KEY = "api:stamp:{}"
+MODIFIED_KEY = "api:modified:{}"
+RESPONSE_KEY = "api:response:{}"
+
+# Справочники (районы, категории, сети, товары) входят в ответы всех
+# предприятий, поэтому их изменения сбрасывают кеш целиком.
+CATALOG = "catalog"
+ORGANIZATIONS = "organizations"
+CATALOG_MODELS = (Category, District, NetworkOrganization, Product)
+
+# Сбросы, накопленные в текущей транзакции. После отката в них могут
+# остаться лишние метки - они сбросятся со следующей фиксацией, что
+# безопасно.
+_pending = threading.local()
+
+
+def district_scope(district_id):
+    return f"district:{district_id}"
+
+
+def organization_scope(organization_id):
+    return f"organization:{organization_id}"
+
+
+def model_scope(model):
+    return f"model:{model._meta.label_lower}"
+
+
+def get_versions(*scopes):
+    """Метки версий scopes и время последнего изменения в наносекундах.
+
+    Метки хранятся без срока жизни: истекшая метка сменила бы ETag и
+    версию ответов без изменения данных. Вытесненная из кеша метка
+    заводится заново из текущего времени, поэтому она гарантированно
+    отличается от всех уже выданных значений. Время изменения в таком
+    случае тоже считается текущим.
+    """
+    stamp_keys = [STAMP_KEY.format(scope) for scope in scopes]
+    modified_keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    values = cache.get_many(stamp_keys + modified_keys)
+    now = time.time_ns()
+    for stamp_key, modified_key in zip(stamp_keys, modified_keys):
+        if stamp_key not in values:
+            cache.add(stamp_key, now, timeout=None)
+            values[stamp_key] = cache.get(stamp_key, now)
+        if modified_key not in values:
+            cache.add(modified_key, now, timeout=None)
+            values[modified_key] = cache.get(modified_key, now)
+    stamps = [values[key] for key in stamp_keys]
+    modified = max((values[key] for key in modified_keys), default=now)
+    return stamps, modified
+
+
+def get_stamps(*scopes):
+    """Текущие метки версий для scopes."""
+    return get_versions(*scopes)[0]
+
+
+def bump(*scopes):
+    now = time.time_ns()
+    for scope in scopes:
+        key = STAMP_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, now, timeout=None)
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, timeout=None
+    )
+
+
+def invalidate_organizations(organization_ids, district_ids=()):
+    """Сбрасывает кеш предприятий после фиксации транзакции.
+
+    Районы предприятий читаются в момент фиксации, поэтому достаточно
+    передать district_ids только для уже удаленных связей. Вызовы внутри
+    одной транзакции копятся и сбрасываются одним запросом.
+    """
+    pending = get_pending()
+    pending["organizations"].update(organization_ids)
+    pending["districts"].update(district_ids)
+    transaction.on_commit(flush_invalidations)
+
+
+def invalidate_catalog(*models):
+    """Сбрасывает кеш справочников models, по умолчанию всех."""
+    get_pending()["catalog"].update(models or CATALOG_MODELS)
+    transaction.on_commit(flush_invalidations)
+
+
+def get_pending():
+    if not hasattr(_pending, "value"):
+        _pending.value = {
+            "catalog": set(),
+            "organizations": set(),
+            "districts": set(),
+        }
+    return _pending.value
+
+
+def flush_invalidations():
+    pending = getattr(_pending, "value", None)
+    if pending is None:
+        return
+    del _pending.value
+    organization_ids = pending["organizations"]
+    districts = pending["districts"]
+    scopes = []
+    if organization_ids:
+        districts |= set(
+            OrganizationDistrict.objects.filter(
+                organization__in=organization_ids
+            ).values_list("district", flat=True)
+        )
+        scopes.append(ORGANIZATIONS)
+    scopes.extend(map(organization_scope, organization_ids))
+    scopes.extend(map(district_scope, districts))
+    if pending["catalog"]:
+        scopes.append(CATALOG)
+        scopes.extend(map(model_scope, pending["catalog"]))
+    bump(*scopes)
+
+
+class ResourceVersionMixin:
+    """Версия ответа list/retrieve по меткам get_cache_scopes вьюсета.
+
+    Версия - это хеш меток, нормализованной строки запроса, формата
+    ответа и SERIALIZER_VERSION; сами метки сбрасываются сигналами из
+    api.signals. Метки читаются до запросов к основным таблицам, поэтому
+    запись, зафиксированная посередине, только сменит версию, но не
+    закрепит за старой версией новые данные.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get_resource_version(self, refresh=False):
+        """Пара (хеш версии, время последнего изменения в нс)."""
+        if refresh or not hasattr(self, "_resource_version"):
+            request = self.request
+            stamps, modified = get_versions(*self.get_cache_scopes())
+            query = sorted(
+                (key, sorted(values))
+                for key, values in request.query_params.lists()
+            )
+            parts = (
+                SERIALIZER_VERSION,
+                self.basename,
+                sorted(self.kwargs.items()),
+                stamps,
+                request.get_host(),
+                request.accepted_renderer.format,
+                query,
+            )
+            digest = hashlib.md5(repr(parts).encode()).hexdigest()
+            self._resource_version = digest, modified
+        return self._resource_version
+
+
+class CachedResponseMixin(ResourceVersionMixin):
+    """Кеширует отрендеренные JSON-ответы list и retrieve по их версии."""
+
+    def get_cache_key(self, request):
+        return RESPONSE_KEY.format(self.get_resource_version()[0])
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        count_cache("response", cached is not None)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = handler(request, *args, **kwargs)
+        return self.store_response(key, response)
+
+    def store_response(self, key, response):
+        if response.status_code != 200:
+            return response
+
+        def store(response):
+            cache.set(
+                key,
+                (response.content, response["Content-Type"]),
+                settings.API_CACHE_TIMEOUT,
+            )
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import ResourceVersionMixin, bump, model_scope
+
+
+class ConditionalRequestMixin(ResourceVersionMixin):
+    """Условные запросы по ETag и Last-Modified.
+
+    ETag - хеш версии ресурса, Last-Modified - время последнего сброса его
+    меток, поэтому GET с If-None-Match или If-Modified-Since отвечает
+    304 Not Modified без запросов к основным таблицам. PUT и PATCH с
+    If-Match, не совпадающим с текущим ETag детального ресурса, получают
+    412 Precondition Failed. If-Match сверяется в транзакции записи под
+    блокировкой строки, поэтому из двух PUT с одним ETag выполняется
+    только первый.
+    """
+
+    def get_validators(self, refresh=False):
+        digest, modified = self.get_resource_version(refresh)
+        return quote_etag(digest), modified // 10**9
+
+    def set_validators(self, response, refresh=False):
+        status = response.status_code
+        if 200 <= status < 300 or status == 304:
+            etag, last_modified = self.get_validators(refresh)
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_conditional_response(self, request, refresh=False):
+        """Ответ 304 или 412, если предусловия запроса не выполнены.
+
+        Last-Modified точен только до секунды, поэтому при If-None-Match
+        (RFC 9110, 13.2.2) If-Modified-Since не проверяется.
+        """
+        etag, last_modified = self.get_validators(refresh)
+        if request.META.get("HTTP_IF_NONE_MATCH"):
+            last_modified = None
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        response = self.get_conditional_response(request)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.set_validators(response)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_object_scope(self):
+        """Метка самого ресурса, которую PUT и PATCH сбрасывают сразу.
+
+        Общие метки (справочники, районы) сбрасывают обработчики из
+        api.signals после фиксации, и только для затронутых записей.
+        """
+        return model_scope(self.get_queryset().model)
+
+    def lock_object(self):
+        """Блокирует строку ресурса до конца транзакции."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        model = self.get_queryset().model
+        list(
+            model._default_manager.select_for_update()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list("pk")
+        )
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_object()
+            response = self.get_conditional_response(request, refresh=True)
+            if response is not None:
+                return response
+            response = super().update(request, *args, **kwargs)
+            # Запись, ждущая блокировку, должна увидеть новый ETag сразу
+            # после фиксации. Ответ, закешированный до фиксации под этой
+            # меткой, отсечет повторный сброс из on_commit.
+            bump(self.get_object_scope())
+        # Метки сбрасываются после фиксации транзакции: внутри внешней
+        # транзакции новая версия еще неизвестна.
+        if transaction.get_connection().in_atomic_block:
+            return response
+        return self.set_validators(response, refresh=True)
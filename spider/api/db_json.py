@@ -0,0 +1,123 @@
+import json
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+
+from organizations.models import Organization
+
+# Тот же JSON, что выдает OrganizationSerializer через JSONRenderer DRF:
+# те же ключи в том же порядке, без пробелов, не-ASCII символы как есть.
+# to_json экранирует строки так же, как json.dumps, а U+2028 и U+2029
+# DRF дополнительно заменяет на \u2028 и \u2029.
+ORGANIZATIONS_SQL = r"""
+SELECT replace(replace(
+    '[' || coalesce(string_agg(doc, ',' ORDER BY ord), '') || ']',
+    chr(8232), '\u2028'), chr(8233), '\u2029')
+FROM (
+    SELECT ids.ord, concat(
+        '{"id":', o.id,
+        ',"name":', to_json(o.name)::text,
+        ',"description":', to_json(o.description)::text,
+        ',"network":', to_json(n.name)::text,
+        ',"count_products":', o.count_products,
+        ',"count_districts":', o.count_districts,
+        ',"district":[', (
+            SELECT string_agg(
+                concat('{"id":', d.id, ',"name":', to_json(d.name)::text, '}'),
+                ',' ORDER BY d.id DESC
+            )
+            FROM organizations_organizationdistrict od
+            JOIN organizations_district d ON d.id = od.district_id
+            WHERE od.organization_id = o.id
+        ),
+        '],"product":[', (
+            SELECT string_agg(
+                concat(
+                    '{"id":', p.id,
+                    ',"name":', to_json(p.name)::text,
+                    ',"category":', to_json(c.name)::text,
+                    ',"price":', po.price, '}'
+                ),
+                ',' ORDER BY po.id
+            )
+            FROM organizations_productorganization po
+            JOIN organizations_product p ON p.id = po.product_id
+            JOIN organizations_category c ON c.id = p.category_id
+            WHERE po.organization_id = o.id
+        ),
+        ']}'
+    ) AS doc
+    FROM unnest(%s::bigint[]) WITH ORDINALITY AS ids(id, ord)
+    JOIN organizations_organization o ON o.id = ids.id
+    JOIN organizations_networkorganization n ON n.id = o.network_id
+) docs
+"""
+
+
+def render_organizations(pks):
+    """JSON-массив предприятий pks в заданном порядке, собранный в базе."""
+    database = router.db_for_read(Organization) or "default"
+    with connections[database].cursor() as cursor:
+        cursor.execute(ORGANIZATIONS_SQL, [list(pks)])
+        return cursor.fetchone()[0]
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class DatabaseJSONMixin:
+    """Отдает list и retrieve JSON-ом, который PostgreSQL строит сам.
+
+    Включается настройкой API_DB_RENDERING. Фильтры, поиск и курсорная
+    пагинация работают как обычно, но по облегченной выборке только
+    первичных ключей; вложенные районы и товары вместе с экранированием
+    строк собирает json-запрос ORGANIZATIONS_SQL.
+    """
+
+    def use_db_rendering(self, request):
+        return (
+            settings.API_DB_RENDERING
+            and connection.vendor == "postgresql"
+            and request.accepted_renderer.format == "json"
+        )
+
+    def get_pk_queryset(self):
+        return (
+            self.filter_queryset(self.get_queryset())
+            .select_related(None)
+            .prefetch_related(None)
+            .only("pk")
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_db_rendering(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_pk_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            content = render_organizations(
+                queryset.values_list("pk", flat=True)
+            )
+        else:
+            results = render_organizations(item.pk for item in page)
+            content = (
+                f'{{"next":{dumps(self.paginator.get_next_link())},'
+                f'"previous":{dumps(self.paginator.get_previous_link())},'
+                f'"results":{results}}}'
+            )
+        return HttpResponse(content, content_type="application/json")
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_db_rendering(request):
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+            self.get_pk_queryset(),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        self.check_object_permissions(request, instance)
+        content = render_organizations([instance.pk])[1:-1]
+        return HttpResponse(content, content_type="application/json")
@@ -1,15 +1,295 @@
+from django import forms
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 
-from organizations.models import Organization, Category
+from organizations.models import (
+    SUMMARY_FIELDS,
+    Category,
+    Organization,
+    ProductOrganization,
+)
+from .cache import get_stamps, model_scope
 
+CATEGORY_KEY = "api:categories:{}"
 
-class OrganizationFilter(filters.FilterSet):
-    categories = filters.ModelMultipleChoiceFilter(
-        field_name="product__category__name",
-        to_field_name="name",
-        queryset=Category.objects.all(),
+PRICE_LOOKUPS = {
+    "product": "product",
+    "min_price": "price__gte",
+    "max_price": "price__lte",
+}
+
+
+def price_rows(params):
+    """Цены предприятия OuterRef("pk"), подходящие под PRICE_LOOKUPS.
+
+    Условия проверяются на одной строке ProductOrganization, поэтому
+    product=1&max_price=500 означает "товар 1 дешевле 500", а не "товар 1
+    и что-нибудь дешевле 500". Подзапрос идет по индексу
+    (organization, price), а с product - по (organization, product).
+    """
+    rows = ProductOrganization.objects.filter(organization=OuterRef("pk"))
+    for name, lookup in PRICE_LOOKUPS.items():
+        value = params.get(name)
+        if value not in (None, ""):
+            rows = rows.filter(**{lookup: value})
+    return rows
+
+
+def has_price_params(params):
+    return any(params.get(name) not in (None, "") for name in PRICE_LOOKUPS)
+
+
+def summary_price_filter(params):
+    """Условие на крайние цены строки района (Organization.in_district).
+
+    Без product одна граница проверяется точно: цена не ниже min_price
+    есть, только если не ниже max_price, и наоборот. Возвращает
+    (условие, нужен ли еще EXISTS по price_rows): с product или с обеими
+    границами строка района лишь отсеивает заведомо неподходящие
+    предприятия.
+    """
+    condition = Q(**{f"{SUMMARY_FIELDS['count_products']}__gt": 0})
+    min_price, max_price = params.get("min_price"), params.get("max_price")
+    if min_price is not None:
+        condition &= Q(**{f"{SUMMARY_FIELDS['max_price']}__gte": min_price})
+    if max_price is not None:
+        condition &= Q(**{f"{SUMMARY_FIELDS['min_price']}__lte": max_price})
+    exact = params.get("product") is None and (
+        min_price is None or max_price is None
     )
+    return condition, not exact
+
+
+def category_ids_by_name():
+    """Словарь название -> id категорий из кеша.
+
+    Ключ включает метку модели Category, поэтому любая запись категории
+    (api.signals) сразу делает словарь недействительным. Названия не
+    уникальны, так что одному названию может соответствовать несколько
+    id.
+    """
+    (stamp,) = get_stamps(model_scope(Category))
+    key = CATEGORY_KEY.format(stamp)
+    names = cache.get(key)
+    if names is None:
+        names = {}
+        for pk, name in Category.objects.values_list("pk", "name"):
+            names.setdefault(name, []).append(pk)
+        cache.set(key, names, settings.API_CACHE_TIMEOUT)
+    return names
+
+
+class CategoryField(forms.Field):
+    """Названия или id категорий, очищенные в множество id."""
+
+    widget = forms.SelectMultiple
+    default_error_messages = {
+        "invalid_choice": "Категория %(value)s не найдена.",
+    }
+
+    def to_python(self, value):
+        if not value:
+            return set()
+        if isinstance(value, str):
+            value = [value]
+        names = category_ids_by_name()
+        known = {pk for ids in names.values() for pk in ids}
+        ids = set()
+        for item in value:
+            if item in names:
+                ids.update(names[item])
+            elif item.isdigit() and int(item) in known:
+                ids.add(int(item))
+            else:
+                raise forms.ValidationError(
+                    self.error_messages["invalid_choice"],
+                    code="invalid_choice",
+                    params={"value": item},
+                )
+        return ids
+
+
+class CategoryFilter(filters.Filter):
+    """Предприятия, у которых есть товар хотя бы одной из категорий.
+
+    На PostgreSQL проверяется список категорий строки района
+    (jsonb @>), на остальных базах - подзапрос EXISTS по целочисленным
+    ключам. В обоих случаях предприятие не повторяется на каждый
+    подходящий товар, а названия сравниваются только со словарем из
+    кеша.
+    """
+
+    field_class = CategoryField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        if connection.vendor == "postgresql":
+            condition = Q()
+            for pk in sorted(value):
+                condition |= Q(
+                    **{f"{SUMMARY_FIELDS['categories']}__contains": [pk]}
+                )
+            return queryset.filter(condition)
+        rows = ProductOrganization.objects.filter(
+            organization=OuterRef("pk"), product__category__in=value
+        )
+        return queryset.filter(Exists(rows))
+
+
+class IntegerFilter(filters.NumberFilter):
+    """Целое число: цены и id хранятся в целочисленных колонках."""
+
+    field_class = forms.IntegerField
+
+
+class OrganizationFilter(filters.FilterSet):
+    """Фильтры списка района: выборка из Organization.in_district."""
+
+    categories = CategoryFilter()
+    # Применяются вместе одним EXISTS в filter_queryset.
+    product = IntegerFilter(method="skip")
+    min_price = IntegerFilter(method="skip")
+    max_price = IntegerFilter(method="skip")
 
     class Meta:
         model = Organization
-        fields = ("categories",)
+        fields = ("categories", "product", "min_price", "max_price")
+
+    def skip(self, queryset, name, value):
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        if any(data.get(name) is not None for name in PRICE_LOOKUPS):
+            condition, need_rows = summary_price_filter(data)
+            queryset = queryset.filter(condition)
+            if need_rows:
+                queryset = queryset.filter(Exists(price_rows(data)))
+        return queryset
+
+
+class PriceOrderingFilter(OrderingFilter):
+    """Сортировка по ценам и count_products для курсорной пагинации.
+
+    min_price и max_price - крайние цены среди строк, подходящих под
+    product/min_price/max_price запроса; у предприятия без цен это 0,
+    потому что курсор не умеет сравнивать с NULL. Без фильтров по цене
+    это колонки строки района с индексом (district, цена), иначе -
+    подзапрос по подходящим строкам. Значения фильтров берутся из
+    проверенного фильтрсета вьюхи, а не из строк запроса. Порядок
+    дополняется -pk: PkCursorPagination хранит в курсоре значения всех
+    полей порядка, и с pk позиция однозначна даже при равных ценах.
+    """
+
+    price_annotations = {"min_price": "price", "max_price": "-price"}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return None
+        return (*ordering, "-pk")
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        params = self.get_price_params(request, queryset, view)
+        rows = price_rows(params)
+        for field in ordering:
+            name = field.lstrip("-")
+            if name not in self.price_annotations:
+                continue
+            if has_price_params(params):
+                price = rows.order_by(self.price_annotations[name]).values(
+                    "price"
+                )[:1]
+                value = Coalesce(Subquery(price), 0)
+            else:
+                value = F(SUMMARY_FIELDS[name])
+            queryset = queryset.annotate(**{name: value})
+        return queryset.order_by(*ordering)
+
+    def get_price_params(self, request, queryset, view):
+        filterset = filters.DjangoFilterBackend().get_filterset(
+            request, queryset, view
+        )
+        if filterset is None or not filterset.is_valid():
+            return {}
+        return filterset.form.cleaned_data
+
+
+class ProductSearchFilter(SearchFilter):
+    """Поиск предприятий по названию товара.
+
+    Вместо JOIN через ProductOrganization каждое слово проверяется
+    подзапросом EXISTS, поэтому предприятие не дублируется на каждый
+    найденный товар. Режим prefix (по умолчанию) использует индекс
+    UPPER(name) text_pattern_ops, режим contains - триграммный индекс и
+    на PostgreSQL сортирует предприятия по сходству названия товара.
+    """
+
+    search_mode_param = "search_mode"
+    modes = ("prefix", "contains")
+    lookups = {"prefix": "istartswith", "contains": "icontains"}
+
+    def get_search_mode(self, request):
+        mode = request.query_params.get(self.search_mode_param)
+        return mode if mode in self.modes else self.modes[0]
+
+    def is_ranked(self, request):
+        return (
+            connection.vendor == "postgresql"
+            and self.get_search_mode(request) == "contains"
+            and bool(self.get_search_terms(request))
+        )
+
+    def construct_search(self, field_name, mode):
+        if field_name[0] in self.lookup_prefixes:
+            field_name = field_name[1:]
+        return f"{field_name}__{self.lookups[mode]}"
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        mode = self.get_search_mode(request)
+        orm_lookups = [
+            self.construct_search(str(search_field), mode)
+            for search_field in search_fields
+        ]
+        rows = ProductOrganization.objects.filter(organization=OuterRef("pk"))
+        for search_term in search_terms:
+            condition = Q()
+            for orm_lookup in orm_lookups:
+                condition |= Q(**{orm_lookup: search_term})
+            queryset = queryset.filter(Exists(rows.filter(condition)))
+
+        if self.is_ranked(request):
+            rank = TrigramWordSimilarity(
+                " ".join(search_terms), "product__name"
+            )
+            ranks = (
+                rows.annotate(rank=rank)
+                .order_by("-rank")
+                .values("rank")[:1]
+            )
+            queryset = queryset.annotate(
+                search_rank=Subquery(ranks, output_field=FloatField())
+            ).order_by(*self.get_ordering(request, queryset, view))
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        if self.is_ranked(request):
+            return ("-search_rank", "-pk")
+        return None
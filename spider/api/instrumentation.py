@@ -0,0 +1,221 @@
+"""Метрики запроса: SQL, сериализация и рендеринг.
+
+InstrumentationMiddleware на время запроса кладет RequestMetrics в
+contextvar. Запросы к БД считает обертка execute_wrapper, которая
+ставится на каждое соединение при подключении; число и время запросов
+всегда уходят в метрики Prometheus (api.metrics). Подробности - тексты
+SQL, время сериализации (TimedSerializerMixin) и рендеринга
+(timed_method) - собираются только для доли INSTRUMENTATION_SAMPLE_RATE
+запросов и уходят в заголовок Server-Timing и одной JSON-строкой в
+логгер api.instrumentation.
+"""
+import functools
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.deprecation import MiddlewareMixin
+
+from .metrics import IN_FLIGHT, observe_request
+
+logger = logging.getLogger(__name__)
+
+current_metrics = ContextVar("current_metrics", default=None)
+
+PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+NUMBER = re.compile(r"\b\d+\b")
+SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """SQL без значений: запросы N+1 дают один и тот же отпечаток."""
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = NUMBER.sub("?", sql)
+    return SPACES.sub(" ", sql).strip()
+
+
+class RequestMetrics:
+    def __init__(self, detailed=True):
+        self.detailed = detailed
+        self.start = time.perf_counter()
+        self.queries = Counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.timings = {"serializer": 0.0, "render": 0.0}
+        # Вложенные вызовы (сериализатор внутри сериализатора) не
+        # учитываются повторно.
+        self.active = set()
+
+    def add_query(self, sql, elapsed):
+        if self.detailed:
+            self.queries[sql] += 1
+        self.query_count += 1
+        self.db_time += elapsed
+
+    def duplicates(self):
+        """Отпечатки, повторившиеся не реже порога, по убыванию числа."""
+        fingerprints = Counter()
+        for sql, count in self.queries.items():
+            fingerprints[fingerprint(sql)] += count
+        threshold = settings.INSTRUMENTATION_DUPLICATE_THRESHOLD
+        return [
+            (sql, count)
+            for sql, count in fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+def timed(name, function, *args, **kwargs):
+    """Вызывает function, добавляя ее время к метрике name запроса."""
+    metrics = current_metrics.get()
+    if metrics is None or not metrics.detailed or name in metrics.active:
+        return function(*args, **kwargs)
+    metrics.active.add(name)
+    start = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+        metrics.active.discard(name)
+
+
+def timed_method(name):
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            return timed(name, method, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TimedSerializerMixin:
+    """Учитывает время to_representation в метрике serializer."""
+
+    def to_representation(self, instance):
+        return timed("serializer", super().to_representation, instance)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Обертка остается на объекте соединения между переподключениями.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """Собирает метрики запросов в синхронном и в ASGI режиме.
+
+    Ставится первым в MIDDLEWARE, чтобы total покрывал всю обработку.
+    """
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        metrics = self.start_metrics()
+        if metrics is None:
+            return self.get_response(request)
+        token = current_metrics.set(metrics)
+        IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = self.start_metrics()
+        if metrics is None:
+            return await self.get_response(request)
+        token = current_metrics.set(metrics)
+        IN_FLIGHT.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start_metrics(self):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        sampled = rate >= 1 or rate > 0 and random.random() < rate
+        if not sampled and not settings.PROMETHEUS_METRICS:
+            return None
+        return RequestMetrics(detailed=sampled)
+
+    def finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.start
+        if settings.PROMETHEUS_METRICS:
+            observe_request(request, response, metrics.query_count, total)
+        if metrics.detailed:
+            self.report(request, response, metrics, total)
+        return response
+
+    def report(self, request, response, metrics, total):
+        duplicates = metrics.duplicates()
+        if settings.INSTRUMENTATION_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join(
+                (
+                    f"db;dur={milliseconds(metrics.db_time)};"
+                    f'desc="queries={metrics.query_count} '
+                    f'duplicates={len(duplicates)}"',
+                    "serializer;"
+                    f"dur={milliseconds(metrics.timings['serializer'])}",
+                    f"render;dur={milliseconds(metrics.timings['render'])}",
+                    f"total;dur={milliseconds(total)}",
+                )
+            )
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": match.view_name if match else None,
+                    "status": response.status_code,
+                    "total_ms": milliseconds(total),
+                    "db_ms": milliseconds(metrics.db_time),
+                    "queries": metrics.query_count,
+                    "serializer_ms": milliseconds(
+                        metrics.timings["serializer"]
+                    ),
+                    "render_ms": milliseconds(metrics.timings["render"]),
+                    "duplicates": [
+                        {
+                            "fingerprint": hashlib.md5(
+                                sql.encode()
+                            ).hexdigest()[:12],
+                            "count": count,
+                            "sql": sql[:300],
+                        }
+                        for sql, count in duplicates
+                    ],
+                },
+                ensure_ascii=False,
+            )
+        )
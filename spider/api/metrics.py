@@ -0,0 +1,100 @@
+"""Метрики Prometheus для /metrics.
+
+Маршрут в метках - имя URL (для вьюсетов это basename роутера и
+действие, например organizations-list), поэтому перцентили считаются
+отдельно для каждого маршрута. Под gunicorn переменная окружения
+PROMETHEUS_MULTIPROC_DIR переключает prometheus_client на файлы в общей
+папке: каждый воркер пишет свои значения, а /metrics складывает их по
+всем воркерам (см. gunicorn.conf.py).
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds",
+    "Время обработки запроса API",
+    ["route", "method", "status"],
+    buckets=(
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.075,
+        0.1,
+        0.25,
+        0.5,
+        0.75,
+        1,
+        2.5,
+        5,
+        10,
+    ),
+)
+REQUEST_QUERIES = Histogram(
+    "api_request_queries",
+    "Число запросов к БД за запрос API",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+RESPONSE_SIZE = Histogram(
+    "api_response_size_bytes",
+    "Размер тела ответа API",
+    ["route"],
+    buckets=tuple(4**power * 256 for power in range(9)),
+)
+CACHE_REQUESTS = Counter(
+    "api_cache_requests",
+    "Обращения к кешам API: доля hit - это hit / (hit + miss)",
+    ["cache", "result"],
+)
+IN_FLIGHT = Gauge(
+    "api_requests_in_flight",
+    "Запросы API в обработке",
+    multiprocess_mode="livesum",
+)
+
+
+def route_name(request):
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.view_name
+
+
+def count_cache(cache, hit):
+    if settings.PROMETHEUS_METRICS:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_request(request, response, queries, duration):
+    route = route_name(request)
+    REQUEST_LATENCY.labels(
+        route, request.method, str(response.status_code)
+    ).observe(duration)
+    REQUEST_QUERIES.labels(route).observe(queries)
+    # Размер потоковых ответов заранее неизвестен.
+    if not response.streaming:
+        RESPONSE_SIZE.labels(route).observe(len(response.content))
+
+
+def metrics_view(request):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,122 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class PkCursorPagination(CursorPagination):
+    """Курсорная пагинация по первичному ключу.
+
+    Порядок совпадает с Meta.ordering моделей, поэтому страница выбирается
+    условием по pk без OFFSET и без COUNT(*), а новые записи не сдвигают
+    уже выданные страницы.
+
+    CursorPagination DRF помнит позицию только по первому полю порядка и
+    на одинаковых значениях (у всех предприятий без цен min_price = 0)
+    переходит на OFFSET. Здесь позиция - значения всех полей порядка,
+    который фильтры завершают pk, поэтому она однозначна и страница
+    выбирается составным условием (значение, pk).
+    """
+
+    ordering = "-pk"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок от первого фильтра, который его задал, иначе -pk."""
+        for filter_cls in getattr(view, "filter_backends", []):
+            if not hasattr(filter_cls, "get_ordering"):
+                continue
+            ordering = filter_cls().get_ordering(request, queryset, view)
+            if ordering:
+                return tuple(ordering)
+        return (self.ordering,)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """CursorPagination.paginate_queryset с условием по всем полям.
+
+        Позиции всех строк различны, поэтому ссылки на соседние страницы
+        всегда строятся без смещения.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(current_position, reverse)
+            )
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        has_position = current_position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next = has_position
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = has_position
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_filter(self, position, reverse):
+        """Строки после position: (a > x) OR (a = x AND b > y) OR ..."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        # Курсоры, выданные до составных позиций, хранят одно значение.
+        if not isinstance(values, list):
+            values = [values]
+        if len(values) != len(self.ordering) or None in values:
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[name])
+            else:
+                values.append(getattr(instance, name))
+        return json.dumps(values)
@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import timed_method
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с тем же результатом, что и у DRF.
+
+    Даты, Decimal, ленивые переводы и прочие типы, которые orjson не
+    знает или выводит иначе, передаются в JSONEncoder DRF. Без orjson, с
+    отступами, ensure_ascii или развернутыми разделителями работает
+    обычный JSONRenderer. Единственное отличие: NaN и Infinity orjson
+    выводит как null, а не падает с ошибкой.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if orjson
+        else 0
+    )
+
+    @timed_method("render")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options
+        )
+        # Как и JSONRenderer, экранируем U+2028 и U+2029, чтобы ответ
+        # оставался корректным JavaScript.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
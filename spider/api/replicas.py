@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+
+from spider.routers import is_pinned, pin_primary, use_replica
+
+from .cache import ResourceVersionMixin
+
+
+class ReplicaReadMixin:
+    """Читает list и retrieve с реплики, если это безопасно.
+
+    На default остаются пользователи, закрепленные после записи, и
+    ресурсы, метки которых сбрасывались последние DATABASE_REPLICA_LAG
+    секунд: иначе ответ с отстающей реплики попал бы в кеш и в ETag под
+    новой версией.
+    """
+
+    replica_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        # Поток WSGI обслуживает запросы по очереди, поэтому флаг
+        # сбрасывается до аутентификации и после ответа.
+        use_replica.set(False)
+        super().initial(request, *args, **kwargs)
+        use_replica.set(self.can_use_replica(request))
+
+    def can_use_replica(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return False
+        if self.action not in self.replica_actions:
+            return False
+        if is_pinned(request.user):
+            return False
+        if isinstance(self, ResourceVersionMixin):
+            _, modified = self.get_resource_version()
+            lag = time.time_ns() - modified
+            if lag < settings.DATABASE_REPLICA_LAG * 10**9:
+                return False
+        return True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        use_replica.set(False)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PinPrimaryMixin:
+    """Закрепляет автора записи за default на DATABASE_REPLICA_LAG."""
+
+    def save(self, **kwargs):
+        instance = super().save(**kwargs)
+        request = self.context.get("request")
+        if request is not None:
+            pin_primary(request.user)
+        return instance
@@ -1,3 +1,6 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 
@@ -10,29 +13,43 @@ from organizations.models import (
     Product,
     ProductOrganization,
 )
+from organizations.signals import refresh_counters
+
+from .cache import invalidate_organizations
+from .instrumentation import TimedSerializerMixin
+from .replicas import PinPrimaryMixin
 
 ERROR_PRICE = "Цена товара должна быть больше или равна нулю!"
+ERROR_PRODUCT = "Товары с id {} не существуют!"
+ERROR_DISTRICT = "Районы с id {} не существуют!"
+ERROR_NETWORK = "Сети с id {} не существуют!"
+ERROR_ORGANIZATION = "Предприятия с id {} не существуют!"
+ERROR_DUPLICATE = "Предприятие с id {} уже есть в запросе!"
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ("id", "name")
 
 
-class DistrictSerializer(serializers.ModelSerializer):
+class DistrictSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = District
         fields = ("id", "name")
 
 
-class NetworkOrganizationSerializer(serializers.ModelSerializer):
+class NetworkOrganizationSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = NetworkOrganization
         fields = ("id", "name")
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(
+    TimedSerializerMixin, PinPrimaryMixin, serializers.ModelSerializer
+):
     category = serializers.CharField(source="category.name")
 
     class Meta:
@@ -59,14 +76,14 @@ class ProductInOrganizationSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'category', 'price')
 
 
-class OrganizationSerializer(serializers.ModelSerializer):
+class OrganizationSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     product = ProductInOrganizationSerializer(
         many=True, source='product_organizations'
     )
     district = DistrictSerializer(many=True)
     network = serializers.CharField(source='network.name')
-    count_products = serializers.SerializerMethodField()
-    count_districts = serializers.SerializerMethodField()
 
     class Meta:
         model = Organization
@@ -81,15 +98,9 @@ class OrganizationSerializer(serializers.ModelSerializer):
             "product",
         )
 
-    def get_count_products(self, obj):
-        return ProductOrganization.objects.filter(organization=obj).count()
-
-    def get_count_districts(self, obj):
-        return OrganizationDistrict.objects.filter(organization=obj).count()
-
 
 class ProductWriteOrganizationSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
+    id = serializers.IntegerField()
     price = serializers.IntegerField()
 
     class Meta:
@@ -101,8 +112,105 @@ class ProductWriteOrganizationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(ERROR_PRICE)
         return value
 
+    def validate(self, attrs):
+        # При PATCH DRF пропускает обязательные поля и у вложенных
+        # сериализаторов, но товар без id или цены записать нельзя.
+        missing = {
+            name: [field.error_messages["required"]]
+            for name, field in self.fields.items()
+            if name not in attrs
+        }
+        if missing:
+            raise serializers.ValidationError(missing)
+        return attrs
+
 
-class OrganizationWriteSerializer(serializers.ModelSerializer):
+def save_prices(prices):
+    """Приводит товары предприятий к prices.
+
+    prices - словарь {id предприятия: {id товара: цена}}. Существующие
+    строки всех предприятий читаются одним запросом и сравниваются с
+    переданными: совпадающие не трогаются, изменившиеся цены обновляются
+    одним bulk_update, а вставляются и удаляются только действительно
+    добавленные и убранные товары.
+    """
+    prices = {pk: dict(items) for pk, items in prices.items()}
+    changed = []
+    removed = []
+    for row in ProductOrganization.objects.filter(
+        organization__in=list(prices)
+    ):
+        wanted = prices[row.organization_id]
+        if row.product_id not in wanted:
+            removed.append(row.pk)
+            continue
+        price = wanted.pop(row.product_id)
+        if row.price != price:
+            row.price = price
+            changed.append(row)
+    if removed:
+        ProductOrganization.objects.filter(pk__in=removed).delete()
+    if changed:
+        ProductOrganization.objects.bulk_update(changed, ["price"])
+    created = [
+        ProductOrganization(
+            product_id=product_id,
+            organization_id=organization_id,
+            price=price,
+        )
+        for organization_id, items in prices.items()
+        for product_id, price in items.items()
+    ]
+    if created:
+        ProductOrganization.objects.bulk_create(created)
+
+
+def save_products(organization, products):
+    """Приводит товары предприятия к списку products, см. save_prices."""
+    save_prices(
+        {
+            organization.pk: {
+                product["product"].pk: product["price"]
+                for product in products
+            }
+        }
+    )
+
+
+def save_districts(districts):
+    """Приводит районы предприятий к districts: {id предприятия: ids}.
+
+    Возвращает id районов, из которых предприятия убраны, для сброса кеша.
+    """
+    districts = {pk: set(ids) for pk, ids in districts.items()}
+    removed = []
+    removed_districts = set()
+    for row in OrganizationDistrict.objects.filter(
+        organization__in=list(districts)
+    ):
+        wanted = districts[row.organization_id]
+        if row.district_id in wanted:
+            wanted.remove(row.district_id)
+        else:
+            removed.append(row.pk)
+            removed_districts.add(row.district_id)
+    if removed:
+        OrganizationDistrict.objects.filter(pk__in=removed).delete()
+    created = [
+        OrganizationDistrict(
+            district_id=district_id, organization_id=organization_id
+        )
+        for organization_id, ids in districts.items()
+        for district_id in ids
+    ]
+    if created:
+        OrganizationDistrict.objects.bulk_create(created)
+    return removed_districts
+
+
+class OrganizationWriteSerializer(
+    PinPrimaryMixin, serializers.ModelSerializer
+):
     district = serializers.PrimaryKeyRelatedField(
         queryset=District.objects.all(), many=True
     )
@@ -119,53 +227,312 @@ class OrganizationWriteSerializer(serializers.ModelSerializer):
             "product",
         )
 
+    def validate_product(self, value):
+        ids = {product["id"] for product in value}
+        products = Product.objects.in_bulk(ids)
+        missing = sorted(ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(
+                ERROR_PRODUCT.format(", ".join(map(str, missing)))
+            )
+        return [
+            {"product": products[product["id"]], "price": product["price"]}
+            for product in value
+        ]
+
+    @transaction.atomic
     def create(self, validated_data):
         districts = validated_data.pop("district")
         products = validated_data.pop("product")
         organization = Organization.objects.create(**validated_data)
-        products = self.context["request"].data["product"]
         districts_list = [
             OrganizationDistrict(district=district, organization=organization)
-            for district in districts
+            for district in dict.fromkeys(districts)
         ]
         OrganizationDistrict.objects.bulk_create(districts_list)
-        produsts_list = []
-        for product in products:
-            product_obj = get_object_or_404(Product, pk=product["id"])
-            produsts_list.append(
-                ProductOrganization(
-                    product=product_obj,
-                    organization=organization,
-                    price=product["price"],
-                )
-            )
-        ProductOrganization.objects.bulk_create(produsts_list)
+        save_products(organization, products)
+        Organization.objects.filter(pk=organization.pk).refresh_counters()
         return organization
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        districts = validated_data.pop("district")
-        products = validated_data.pop("product")
-        products = self.context["request"].data["product"]
-        ProductOrganization.objects.filter(organization=instance).delete()
-        produsts_list = []
-        for product in products:
-            product_obj = get_object_or_404(Product, pk=product["id"])
-            produsts_list.append(
-                ProductOrganization(
-                    product=product_obj,
-                    organization=instance,
-                    price=product["price"],
-                )
-            )
-        ProductOrganization.objects.bulk_create(produsts_list)
-        instance.district.set(districts)
+        districts = validated_data.pop("district", None)
+        products = validated_data.pop("product", None)
+        if products is not None:
+            save_products(instance, products)
+        if districts is not None:
+            instance.district.set(districts)
         instance.name = validated_data.get('name', instance.name)
         instance.description = validated_data.get(
             'description', instance.description
         )
         instance.network = validated_data.get('network', instance.network)
         instance.save()
+        Organization.objects.filter(pk=instance.pk).refresh_counters()
         return instance
 
     def to_representation(self, instance):
+        instance = Organization.objects.for_read().get(pk=instance.pk)
         return OrganizationSerializer(instance, context=self.context).data
+
+
+def pk_values(values):
+    pks = set()
+    for value in values:
+        try:
+            pks.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return pks
+
+
+def bulk_references(items):
+    """Справочники для пакета items: по одному запросу на модель.
+
+    Собираются id из еще не провалидированных данных, некорректные
+    значения пропускаются - их отклонит сериализатор элемента.
+    """
+    ids = defaultdict(list)
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        ids[Organization].append(item.get("id"))
+        ids[NetworkOrganization].append(item.get("network"))
+        if isinstance(item.get("district"), list):
+            ids[District].extend(item["district"])
+        if isinstance(item.get("product"), list):
+            ids[Product].extend(
+                product.get("id")
+                for product in item["product"]
+                if isinstance(product, dict)
+            )
+    return {
+        model: model.objects.in_bulk(pk_values(ids[model]))
+        for model in (Organization, NetworkOrganization, District, Product)
+    }
+
+
+class OrganizationBulkItemSerializer(OrganizationWriteSerializer):
+    """Элемент пакетной записи: с id - обновление, без id - создание.
+
+    Обновление частичное, как PATCH. Ссылки проверяются по словарям из
+    context["references"] (bulk_references), а не запросом на элемент.
+    """
+
+    id = serializers.IntegerField(required=False)
+    network = serializers.IntegerField()
+    district = serializers.ListField(child=serializers.IntegerField())
+
+    def get_references(self, model, ids, error):
+        objects = self.context["references"][model]
+        missing = sorted(set(ids) - objects.keys())
+        if missing:
+            raise serializers.ValidationError(
+                error.format(", ".join(map(str, missing)))
+            )
+        return [objects[pk] for pk in ids]
+
+    def validate_id(self, value):
+        (organization,) = self.get_references(
+            Organization, [value], ERROR_ORGANIZATION
+        )
+        return organization
+
+    def validate_network(self, value):
+        (network,) = self.get_references(
+            NetworkOrganization, [value], ERROR_NETWORK
+        )
+        return network
+
+    def validate_district(self, value):
+        return self.get_references(District, value, ERROR_DISTRICT)
+
+    def validate_product(self, value):
+        products = self.get_references(
+            Product, [product["id"] for product in value], ERROR_PRODUCT
+        )
+        return [
+            {"product": item, "price": product["price"]}
+            for item, product in zip(products, value)
+        ]
+
+
+def save_organizations(items):
+    """Пишет провалидированные элементы пакета в одной транзакции.
+
+    Новые предприятия вставляются одним bulk_create, измененные
+    обновляются одним bulk_update, районы и товары всех предприятий
+    сверяются через save_districts и save_prices. Возвращает предприятия
+    в порядке items.
+    """
+    organizations = []
+    districts = {}
+    prices = {}
+    with transaction.atomic():
+        for item in items:
+            item = dict(item)
+            organization = item.pop("id", None) or Organization()
+            district = item.pop("district", None)
+            products = item.pop("product", None)
+            for field, value in item.items():
+                setattr(organization, field, value)
+            organizations.append((organization, district, products))
+        Organization.objects.bulk_create(
+            organization
+            for organization, _, _ in organizations
+            if organization.pk is None
+        )
+        updated = [
+            organization
+            for organization, _, _ in organizations
+            if not organization._state.adding
+        ]
+        if updated:
+            Organization.objects.bulk_update(
+                updated, ["name", "description", "network"]
+            )
+        for organization, district, products in organizations:
+            if district is not None:
+                districts[organization.pk] = [item.pk for item in district]
+            if products is not None:
+                prices[organization.pk] = {
+                    product["product"].pk: product["price"]
+                    for product in products
+                }
+        removed_districts = save_districts(districts)
+        save_prices(prices)
+        ids = [organization.pk for organization, _, _ in organizations]
+        # Один пересчет после фиксации вместе с предприятиями, которые
+        # отметили сигналы удаленных связей.
+        refresh_counters(ids)
+        invalidate_organizations(ids, removed_districts)
+    return [organization for organization, _, _ in organizations]
+
+
+def bulk_save_organizations(items, context):
+    """Проверяет и сохраняет пакет items, возвращает результат по элементам.
+
+    Ошибочные элементы пропускаются, остальные пишутся вместе. Результат
+    элемента - {"id", "status": "created" | "updated"} или
+    {"status": "error", "errors"}.
+    """
+    context = {**context, "references": bulk_references(items)}
+    results = []
+    valid = []
+    seen = set()
+    for item in items:
+        serializer = OrganizationBulkItemSerializer(
+            data=item,
+            partial=isinstance(item, dict) and "id" in item,
+            context=context,
+        )
+        if not serializer.is_valid():
+            results.append({"status": "error", "errors": serializer.errors})
+            continue
+        organization = serializer.validated_data.get("id")
+        if organization is not None:
+            if organization.pk in seen:
+                results.append(
+                    {
+                        "status": "error",
+                        "errors": {
+                            "id": [ERROR_DUPLICATE.format(organization.pk)]
+                        },
+                    }
+                )
+                continue
+            seen.add(organization.pk)
+        result = {"status": "updated" if organization else "created"}
+        results.append(result)
+        valid.append((result, serializer.validated_data))
+    organizations = save_organizations([data for _, data in valid])
+    for (result, _), organization in zip(valid, organizations):
+        result["id"] = organization.pk
+    return results
+
+
+class ProductPriceSerializer(serializers.Serializer):
+    organization = serializers.IntegerField()
+    product = serializers.IntegerField()
+    price = serializers.IntegerField()
+
+    def validate_price(self, value):
+        if value < 0:
+            raise serializers.ValidationError(ERROR_PRICE)
+        return value
+
+
+UPDATE_PRICES_SQL = """
+WITH data (organization_id, product_id, price) AS (VALUES {values}),
+updated AS (
+    UPDATE {table} AS price_row SET price = data.price
+    FROM data
+    WHERE price_row.organization_id = data.organization_id
+        AND price_row.product_id = data.product_id
+        AND price_row.price <> data.price
+    RETURNING price_row.organization_id, price_row.product_id
+)
+SELECT organization_id, product_id, TRUE FROM updated
+UNION ALL
+SELECT data.organization_id, data.product_id, FALSE FROM data
+WHERE NOT EXISTS (
+    SELECT 1 FROM {table} AS price_row
+    WHERE price_row.organization_id = data.organization_id
+        AND price_row.product_id = data.product_id
+)
+"""
+
+
+def update_prices(prices):
+    """Меняет цены {(id предприятия, id товара): цена} без чтения строк.
+
+    На PostgreSQL это один UPDATE ... FROM (VALUES ...), который заодно
+    находит отсутствующие пары, на остальных базах - выборка и
+    bulk_update. Строки с той же ценой не перезаписываются, строки
+    районов пересобираются только у предприятий с измененными ценами.
+    Возвращает пару (измененные пары, отсутствующие пары).
+    """
+    if not prices:
+        return [], []
+    if connection.vendor == "postgresql":
+        sql = UPDATE_PRICES_SQL.format(
+            values=", ".join(["(%s, %s, %s)"] * len(prices)),
+            table=connection.ops.quote_name(
+                ProductOrganization._meta.db_table
+            ),
+        )
+        params = [
+            value
+            for (organization_id, product_id), price in prices.items()
+            for value in (organization_id, product_id, price)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        changed = [(row[0], row[1]) for row in rows if row[2]]
+        missing = [(row[0], row[1]) for row in rows if not row[2]]
+    else:
+        rows = ProductOrganization.objects.filter(
+            organization__in={key[0] for key in prices},
+            product__in={key[1] for key in prices},
+        ).only("organization", "product", "price")
+        found = set()
+        updated = []
+        for row in rows:
+            key = (row.organization_id, row.product_id)
+            if key not in prices:
+                continue
+            found.add(key)
+            if row.price != prices[key]:
+                row.price = prices[key]
+                updated.append(row)
+        ProductOrganization.objects.bulk_update(updated, ["price"])
+        changed = [(row.organization_id, row.product_id) for row in updated]
+        missing = [key for key in prices if key not in found]
+    organization_ids = {key[0] for key in changed}
+    if organization_ids:
+        Organization.objects.filter(
+            pk__in=organization_ids
+        ).refresh_summaries()
+    invalidate_organizations(organization_ids)
+    return changed, missing
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    Organization,
+    OrganizationDistrict,
+    Product,
+    ProductOrganization,
+)
+from organizations.signals import catalog_created, organizations_refreshed
+from .authentication import invalidate_tokens
+from .cache import invalidate_catalog, invalidate_organizations
+
+RELATED_FIELDS = {
+    OrganizationDistrict: "district",
+    ProductOrganization: "product",
+}
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=District)
+@receiver(post_delete, sender=District)
+@receiver(post_save, sender=NetworkOrganization)
+@receiver(post_delete, sender=NetworkOrganization)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(catalog_created)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog(sender)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def organization_changed(sender, instance, **kwargs):
+    invalidate_organizations([instance.pk])
+
+
+@receiver(pre_save, sender=OrganizationDistrict)
+def organization_district_moved(sender, instance, **kwargs):
+    """Запоминает прежний район, если связь перевели в другой."""
+    if instance.pk is None:
+        return
+    instance._old_district_id = (
+        OrganizationDistrict.objects.filter(pk=instance.pk)
+        .values_list("district", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=OrganizationDistrict)
+@receiver(post_delete, sender=OrganizationDistrict)
+def organization_district_changed(sender, instance, **kwargs):
+    district_ids = {instance.district_id}
+    old_district_id = getattr(instance, "_old_district_id", None)
+    if old_district_id is not None:
+        district_ids.add(old_district_id)
+    invalidate_organizations([instance.organization_id], district_ids)
+
+
+@receiver(post_save, sender=ProductOrganization)
+@receiver(post_delete, sender=ProductOrganization)
+def product_organization_changed(sender, instance, **kwargs):
+    invalidate_organizations([instance.organization_id])
+
+
+@receiver(organizations_refreshed)
+def organization_counters_refreshed(sender, organization_ids, **kwargs):
+    invalidate_organizations(organization_ids)
+
+
+@receiver(m2m_changed, sender=OrganizationDistrict)
+@receiver(m2m_changed, sender=ProductOrganization)
+def organization_relations_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    related_field = RELATED_FIELDS[sender]
+    if reverse:
+        own_field, other_field = related_field, "organization"
+    else:
+        own_field, other_field = "organization", related_field
+    if action == "pre_clear":
+        pk_set = set(
+            sender.objects.filter(**{own_field: instance}).values_list(
+                other_field, flat=True
+            )
+        )
+    if reverse:
+        organization_ids, related_ids = pk_set, [instance.pk]
+    else:
+        organization_ids, related_ids = [instance.pk], pk_set
+    district_ids = related_ids if sender is OrganizationDistrict else ()
+    invalidate_organizations(organization_ids, district_ids)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, created, **kwargs):
+    """Деактивация и любые другие правки пользователя сбрасывают кеш."""
+    if created:
+        return
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
@@ -0,0 +1,50 @@
+"""Потоковые ответы под ASGI.
+
+ASGIHandler в Django 4.1 перебирает StreamingHttpResponse синхронно
+прямо в цикле событий, поэтому генератор, который читает ORM, падает с
+SynchronousOnlyOperation уже после отправки заголовков.
+AsyncStreamingHttpResponse хранит асинхронный итератор, а
+spider.asgi.ASGIHandler отправляет его через async for.
+"""
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator, batch_size):
+    """Части синхронного iterator, вычисленные пачками в потоке запроса.
+
+    thread_sensitive держит все пачки в одном потоке, поэтому серверный
+    курсор и соединение с БД не переходят между потоками.
+    """
+    iterator = iter(iterator)
+    next_batch = sync_to_async(
+        lambda: list(itertools.islice(iterator, batch_size)),
+        thread_sensitive=True,
+    )
+    while batch := await next_batch():
+        for part in batch:
+            yield part
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """StreamingHttpResponse с асинхронным итератором содержимого."""
+
+    def __init__(self, streaming_content, *args, **kwargs):
+        super().__init__((), *args, **kwargs)
+        self.async_streaming_content = streaming_content
+
+    def __iter__(self):
+        raise TypeError(
+            "AsyncStreamingHttpResponse перебирается только через async for"
+        )
+
+    async def __aiter__(self):
+        async for part in self.async_streaming_content:
+            yield self.make_bytes(part)
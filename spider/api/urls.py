@@ -4,8 +4,11 @@ from rest_framework.authtoken import views
 from rest_framework.routers import DefaultRouter
 
 from .views import (
+    DatabasePoolStats,
     OrganizationAll,
+    OrganizationExport,
     OrganizationViewSet,
+    ProductPriceUpdate,
     ProductViewSet,
     CategoryViewSet,
     DistrictViewSet,
@@ -33,5 +36,16 @@ router.register(
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "organizations_export/",
+        OrganizationExport.as_view(),
+        name="organizations_export",
+    ),
+    path(
+        "organizations_prices/",
+        ProductPriceUpdate.as_view(),
+        name="organizations_prices",
+    ),
+    path("db_pool/", DatabasePoolStats.as_view(), name="db_pool"),
     path('auth/', views.obtain_auth_token),
 ]
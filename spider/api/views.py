@@ -1,5 +1,14 @@
+import csv
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from organizations.models import (
@@ -9,7 +18,27 @@ from organizations.models import (
     District,
     NetworkOrganization,
 )
-from .filters import OrganizationFilter
+from spider.backends.postgresql_pool.base import pool_stats
+from spider.routers import pin_primary
+from .async_views import AsyncReadMixin
+from .cache import (
+    CATALOG,
+    ORGANIZATIONS,
+    CachedResponseMixin,
+    district_scope,
+    model_scope,
+    organization_scope,
+)
+from .conditional import ConditionalRequestMixin
+from .db_json import DatabaseJSONMixin
+from .filters import (
+    OrganizationFilter,
+    PriceOrderingFilter,
+    ProductSearchFilter,
+)
+from .pagination import PkCursorPagination
+from .replicas import ReplicaReadMixin
+from .renderers import ORJSONRenderer
 
 from .serializers import (
     OrganizationSerializer,
@@ -18,45 +47,275 @@ from .serializers import (
     DistrictSerializer,
     NetworkOrganizationSerializer,
     OrganizationWriteSerializer,
+    ProductPriceSerializer,
+    bulk_save_organizations,
+    update_prices,
 )
+from .streaming import AsyncStreamingHttpResponse, is_asgi, iterate_in_thread
 
+ERROR_BULK = "Ожидается список не более чем из {} предприятий."
+ERROR_BULK_PRICES = "Ожидается список не более чем из {} цен."
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.all()
+
+class ProductViewSet(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    ModelViewSet,
+):
+    queryset = Product.objects.select_related("category")
     serializer_class = ProductSerializer
+    pagination_class = PkCursorPagination
+
+    def get_cache_scopes(self):
+        return [model_scope(Product), model_scope(Category)]
 
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    ModelViewSet,
+):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def get_cache_scopes(self):
+        return [model_scope(Category)]
 
-class DistrictViewSet(ModelViewSet):
+
+class DistrictViewSet(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    ModelViewSet,
+):
     queryset = District.objects.all()
     serializer_class = DistrictSerializer
 
+    def get_cache_scopes(self):
+        return [model_scope(District)]
+
 
-class NetworkOrganizationViewSet(ModelViewSet):
+class NetworkOrganizationViewSet(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    ModelViewSet,
+):
     queryset = NetworkOrganization.objects.all()
     serializer_class = NetworkOrganizationSerializer
 
+    def get_cache_scopes(self):
+        return [model_scope(NetworkOrganization)]
 
-class OrganizationViewSet(ReadOnlyModelViewSet):
+
+class OrganizationViewSet(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    DatabaseJSONMixin,
+    ReadOnlyModelViewSet,
+):
     serializer_class = OrganizationSerializer
-    filter_backends = (DjangoFilterBackend, SearchFilter)
+    pagination_class = PkCursorPagination
+    filter_backends = (
+        DjangoFilterBackend,
+        PriceOrderingFilter,
+        ProductSearchFilter,
+    )
     filterset_class = OrganizationFilter
     search_fields = ("^product__name",)
+    ordering_fields = ("min_price", "max_price", "count_products")
 
     def get_queryset(self, **kwargs):
         district_id = self.kwargs.get("district_id")
-        return Organization.objects.filter(district=district_id)
+        return Organization.objects.in_district(district_id).for_read()
+
+    def get_cache_scopes(self):
+        scopes = [CATALOG, district_scope(self.kwargs["district_id"])]
+        if "pk" in self.kwargs:
+            scopes.append(organization_scope(self.kwargs["pk"]))
+        return scopes
 
 
-class OrganizationAll(ModelViewSet):
-    queryset = Organization.objects.all()
+class OrganizationAll(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    DatabaseJSONMixin,
+    ModelViewSet,
+):
+    queryset = Organization.objects.for_read()
     serializer_class = OrganizationSerializer
+    pagination_class = PkCursorPagination
 
     def get_serializer_class(self):
         if self.request.method == "GET":
             return OrganizationSerializer
         return OrganizationWriteSerializer
+
+    def get_cache_scopes(self):
+        if "pk" in self.kwargs:
+            return [CATALOG, organization_scope(self.kwargs["pk"])]
+        return [CATALOG, ORGANIZATIONS]
+
+    def get_object_scope(self):
+        return organization_scope(self.kwargs["pk"])
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Пакетное создание и обновление предприятий.
+
+        Принимает список в формате OrganizationWriteSerializer; элемент с
+        id обновляет предприятие (частично), без id - создает новое.
+        """
+        limit = settings.API_BULK_MAX_ITEMS
+        if not isinstance(request.data, list) or len(request.data) > limit:
+            raise ValidationError(
+                {"non_field_errors": [ERROR_BULK.format(limit)]}
+            )
+        results = bulk_save_organizations(
+            request.data, self.get_serializer_context()
+        )
+        pin_primary(request.user)
+        return Response({"results": results})
+
+
+class Echo:
+    """Объект-файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+CSV_FIELDS = (
+    "id",
+    "organization",
+    "description",
+    "network",
+    "districts",
+    "product",
+    "category",
+    "price",
+)
+
+
+def export_jsonl(organizations):
+    renderer = ORJSONRenderer()
+    for organization in organizations:
+        yield renderer.render(OrganizationSerializer(organization).data)
+        yield b"\n"
+
+
+def export_csv(organizations):
+    """Одна строка на цену, в формате команды import_catalog."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for organization in organizations:
+        head = (
+            organization.pk,
+            organization.name,
+            organization.description,
+            organization.network.name,
+            ";".join(
+                district.name for district in organization.district.all()
+            ),
+        )
+        rows = organization.product_organizations.all()
+        if not rows:
+            yield writer.writerow(head + ("", "", ""))
+        for row in rows:
+            yield writer.writerow(
+                head + (row.product.name, row.product.category.name, row.price)
+            )
+
+
+class OrganizationExport(APIView):
+    """Потоковая выгрузка всех предприятий в JSONL или CSV.
+
+    Предприятия читаются серверным курсором пачками по chunk_size вместе
+    с prefetch районов и товаров, так что память не растет с размером
+    таблицы, а первые байты уходят клиенту сразу. Под ASGI генератор
+    выгрузки выполняется пачками в потоке (iterate_in_thread), а не в
+    цикле событий.
+    """
+
+    chunk_size = 2000
+    exporters = {
+        "jsonl": (export_jsonl, "application/jsonl; charset=utf-8"),
+        "csv": (export_csv, "text/csv; charset=utf-8"),
+    }
+
+    def get(self, request):
+        export_type = request.query_params.get("type", "jsonl")
+        if export_type not in self.exporters:
+            raise ValidationError(
+                {"type": f"Допустимые значения: {', '.join(self.exporters)}"}
+            )
+        exporter, content_type = self.exporters[export_type]
+        organizations = (
+            Organization.objects.for_read()
+            .order_by("pk")
+            .iterator(chunk_size=self.chunk_size)
+        )
+        content = exporter(organizations)
+        if is_asgi(request):
+            response = AsyncStreamingHttpResponse(
+                iterate_in_thread(content, self.chunk_size),
+                content_type=content_type,
+            )
+        else:
+            response = StreamingHttpResponse(
+                content, content_type=content_type
+            )
+        response["Content-Disposition"] = (
+            f'attachment; filename="organizations.{export_type}"'
+        )
+        return response
+
+
+class DatabasePoolStats(APIView):
+    """Статистика пулов соединений с БД в обслужившем запрос воркере."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class ProductPriceUpdate(APIView):
+    """Пакетное изменение цен товаров предприятий.
+
+    Принимает список {"organization", "product", "price"}; повторная пара
+    берет последнюю цену. Отвечает числом измененных и неизменившихся
+    строк и списком пар, которых нет в базе.
+    """
+
+    def post(self, request):
+        limit = settings.API_BULK_MAX_PRICES
+        if not isinstance(request.data, list) or len(request.data) > limit:
+            raise ValidationError(
+                {"non_field_errors": [ERROR_BULK_PRICES.format(limit)]}
+            )
+        serializer = ProductPriceSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        prices = {
+            (item["organization"], item["product"]): item["price"]
+            for item in serializer.validated_data
+        }
+        with transaction.atomic():
+            changed, missing = update_prices(prices)
+        pin_primary(request.user)
+        return Response(
+            {
+                "changed": len(changed),
+                "unchanged": len(prices) - len(changed) - len(missing),
+                "missing": [
+                    {"organization": organization, "product": product}
+                    for organization, product in missing
+                ],
+            }
+        )
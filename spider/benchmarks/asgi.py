@@ -0,0 +1,197 @@
+"""Пропускная способность маршрутов чтения под WSGI и под ASGI.
+
+Запуск из папки spider::
+
+    python -m benchmarks.asgi --requests 2000 --workers 4 --concurrency 200
+
+WSGI обслуживает запросы пулом из --workers потоков, как синхронные
+воркеры gunicorn, по одному запросу на воркер. ASGI держит до
+--concurrency запросов в одном цикле событий, как воркер uvicorn. В обоих
+случаях вызываются настоящие приложения из spider.wsgi и spider.asgi.
+Кеш по умолчанию отключен, чтобы замерять путь через БД; с --cache
+остаются кеш ответов, ответы 304 и кеш токенов.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from organizations.models import Organization  # noqa: E402
+from .dataset import seed  # noqa: E402
+from .measure import percentile, test_database  # noqa: E402
+
+DUMMY_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+def wsgi_request(application, url, token):
+    environ = RequestFactory().get(
+        url, HTTP_AUTHORIZATION=f"Token {token}"
+    ).environ
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    response = application(environ, start_response)
+    b"".join(response)
+    response.close()
+    return statuses[0]
+
+
+async def asgi_request(application, url, token):
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", f"Token {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    received = False
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif not message.get("more_body"):
+            disconnect.set()
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def summary(timings, elapsed, statuses):
+    assert set(statuses) == {200}, statuses
+    return {
+        "rps": round(len(timings) / elapsed),
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+    }
+
+
+def run_wsgi(url, token, requests, workers):
+    application = get_wsgi_application()
+
+    def timed(_):
+        start = time.perf_counter()
+        status = wsgi_request(application, url, token)
+        return status, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    statuses, timings = zip(*results)
+    return summary(timings, elapsed, statuses)
+
+
+def run_asgi(url, token, requests, concurrency):
+    application = get_asgi_application()
+
+    async def timed(semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            status = await asgi_request(application, url, token)
+            return status, (time.perf_counter() - start) * 1000
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(
+            *(timed(semaphore) for _ in range(requests))
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    statuses, timings = zip(*results)
+    return summary(timings, elapsed, statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--prices", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--keepdb", action="store_true")
+    args = parser.parse_args()
+
+    with test_database(args.keepdb):
+        data = seed(
+            organizations=args.organizations,
+            products=args.products,
+            prices=args.prices,
+        )
+        user = User.objects.get_or_create(username="benchmark")[0]
+        token = Token.objects.get_or_create(user=user)[0].key
+        organization = Organization.objects.order_by("pk").first().pk
+        routes = {
+            "categories:list": "/categories/",
+            "districts:list": "/districts/",
+            "organizations:list": (
+                f"/organizations/{data['district']}/"
+                f"?page_size={args.page_size}"
+            ),
+            "organizations_all:detail": f"/organizations_all/{organization}/",
+        }
+        caches = {} if args.cache else {"CACHES": DUMMY_CACHE}
+        results = {}
+        with override_settings(**caches):
+            for route, url in routes.items():
+                results[route] = {
+                    "wsgi": run_wsgi(url, token, args.requests, args.workers),
+                    "asgi": run_asgi(
+                        url, token, args.requests, args.concurrency
+                    ),
+                }
+    print(json.dumps(
+        {"dataset": data, "results": results}, ensure_ascii=False, indent=2
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Синтетический набор данных для замеров.
+
+Объемы задаются числом предприятий, товаров и цен на предприятие, так
+что одни и те же функции наполняют базу и на 10³, и на 10⁶ строк.
+"""
+import random
+
+from django.db import connection
+
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    Organization,
+    OrganizationDistrict,
+    Product,
+    ProductOrganization,
+)
+
+BATCH_SIZE = 10000
+WORDS = ("Молоко", "Хлеб", "Сыр", "Кофе", "Чай", "Масло", "Сок", "Мука")
+
+
+def batches(total, size=BATCH_SIZE):
+    for start in range(0, total, size):
+        yield range(start, min(start + size, total))
+
+
+def seed(
+    organizations=1000,
+    products=1000,
+    prices=10,
+    districts=20,
+    categories=20,
+    districts_per_organization=2,
+    random_seed=0,
+):
+    """Наполняет пустую базу и возвращает сводку по созданным данным.
+
+    Если товары уже есть (например, тестовая база сохранена через
+    --keepdb), наполнение пропускается.
+    """
+    if Product.objects.exists():
+        return summary()
+    rng = random.Random(random_seed)
+    category_list = Category.objects.bulk_create(
+        Category(name=f"Категория {number}") for number in range(categories)
+    )
+    district_ids = [
+        district.pk
+        for district in District.objects.bulk_create(
+            District(name=f"Район {number}") for number in range(districts)
+        )
+    ]
+    network = NetworkOrganization.objects.create(name="Сеть")
+    product_ids = []
+    for batch in batches(products):
+        product_ids.extend(
+            product.pk
+            for product in Product.objects.bulk_create(
+                Product(
+                    name=f"{WORDS[number % len(WORDS)]} {number}",
+                    category=category_list[number % categories],
+                )
+                for number in batch
+            )
+        )
+    for batch in batches(organizations):
+        created = Organization.objects.bulk_create(
+            Organization(
+                name=f"Предприятие {number}",
+                description="Описание",
+                network=network,
+            )
+            for number in batch
+        )
+        OrganizationDistrict.objects.bulk_create(
+            OrganizationDistrict(organization=organization, district_id=pk)
+            for organization in created
+            for pk in rng.sample(
+                district_ids, min(districts_per_organization, districts)
+            )
+        )
+        ProductOrganization.objects.bulk_create(
+            (
+                ProductOrganization(
+                    organization=organization,
+                    product_id=pk,
+                    price=rng.randint(0, 10000),
+                )
+                for organization in created
+                for pk in rng.sample(product_ids, min(prices, products))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Organization.objects.filter(
+            pk__in=[organization.pk for organization in created]
+        ).refresh_counters()
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    return summary()
+
+
+def summary():
+    return {
+        "organizations": Organization.objects.count(),
+        "products": Product.objects.count(),
+        "prices": ProductOrganization.objects.count(),
+        "district": District.objects.order_by("pk").first().pk,
+        "category": Category.objects.order_by("pk").first().name,
+    }
@@ -0,0 +1,63 @@
+"""Общие функции замеров: тестовая база, задержка, запросы и память."""
+import contextlib
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+@contextlib.contextmanager
+def test_database(keepdb=False):
+    """Создает тестовую базу, чтобы замеры не трогали рабочие данные."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round((len(values) - 1) * fraction)]
+
+
+def measure(request, repeat, expected_status=200):
+    """Выполняет request() repeat раз и возвращает сводку метрик.
+
+    Кеш ответов очищается перед каждым вызовом, чтобы замерять полный
+    путь запроса; пиковая память снимается отдельным прогоном под
+    tracemalloc, чтобы он не искажал задержку.
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == expected_status, response.content
+        queries = max(queries, len(context.captured_queries))
+
+    cache.clear()
+    tracemalloc.start()
+    request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "queries": queries,
+        "peak_memory_kb": round(peak / 1024),
+    }
@@ -0,0 +1,78 @@
+"""Замер фильтров и сортировки предприятий по цене.
+
+Запуск из папки spider (данные создаются в тестовой базе)::
+
+    python -m benchmarks.prices --organizations 20000 --prices 50 --keepdb
+
+По умолчанию создается миллион строк ProductOrganization. Выводит метрики
+GET /organizations/{district_id}/ с фильтрами product, min_price,
+max_price и сортировками ordering=min_price|max_price|count_products.
+"""
+import argparse
+import json
+import os
+from urllib.parse import urlencode
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from organizations.models import Product  # noqa: E402
+from .dataset import seed  # noqa: E402
+from .measure import measure, test_database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--organizations", type=int, default=20000)
+    parser.add_argument("--prices", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keepdb", action="store_true")
+    args = parser.parse_args()
+
+    with test_database(args.keepdb):
+        data = seed(
+            organizations=args.organizations,
+            products=args.products,
+            prices=args.prices,
+            districts=1,
+        )
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.get_or_create(username="benchmark")[0]
+        )
+        product = Product.objects.order_by("pk").values_list("pk")[0][0]
+        url = f"/organizations/{data['district']}/"
+        queries = {
+            "без фильтров": {},
+            "product+max_price": {"product": product, "max_price": 500},
+            "min_price+max_price": {"min_price": 100, "max_price": 200},
+            "ordering=min_price": {"ordering": "min_price"},
+            "ordering=-max_price": {"ordering": "-max_price"},
+            "ordering=-count_products": {"ordering": "-count_products"},
+            "max_price+ordering=min_price": {
+                "max_price": 500,
+                "ordering": "min_price",
+            },
+        }
+        results = {}
+        for name, params in queries.items():
+            query = urlencode({**params, "page_size": args.page_size})
+            results[name] = measure(
+                lambda: client.get(f"{url}?{query}"), args.repeat
+            )
+        print(json.dumps(
+            {"dataset": data, "results": results},
+            ensure_ascii=False,
+            indent=2,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Сравнение JSONRenderer/JSONParser DRF с ORJSONRenderer/ORJSONParser.
+
+Запуск из папки spider::
+
+    python -m benchmarks.renderers --organizations 1000 --prices 50
+
+Данные - настоящие ответы OrganizationSerializer на синтетическом наборе
+в тестовой базе.
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.parsers import ORJSONParser  # noqa: E402
+from api.renderers import ORJSONRenderer  # noqa: E402
+from api.serializers import OrganizationSerializer  # noqa: E402
+from organizations.models import Organization  # noqa: E402
+from .dataset import seed  # noqa: E402
+from .measure import test_database  # noqa: E402
+
+
+def throughput(function, size, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        "ms": round(elapsed * 1000, 2),
+        "mb_per_s": round(size / elapsed / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--prices", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with test_database():
+        seed(
+            organizations=args.organizations,
+            products=args.products,
+            prices=args.prices,
+        )
+        data = OrganizationSerializer(
+            Organization.objects.for_read(), many=True
+        ).data
+
+    body = JSONRenderer().render(data)
+    assert ORJSONRenderer().render(data) == body
+    results = {"payload_kb": round(len(body) / 1024)}
+    for name, renderer in (
+        ("render:drf", JSONRenderer()),
+        ("render:orjson", ORJSONRenderer()),
+    ):
+        results[name] = throughput(
+            lambda: renderer.render(data), len(body), args.repeat
+        )
+    for name, json_parser in (
+        ("parse:drf", JSONParser()),
+        ("parse:orjson", ORJSONParser()),
+    ):
+        results[name] = throughput(
+            lambda: json_parser.parse(io.BytesIO(body)), len(body), args.repeat
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
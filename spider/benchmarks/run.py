@@ -0,0 +1,182 @@
+"""Замеры всех маршрутов API на синтетических данных.
+
+Запуск из папки spider::
+
+    python -m benchmarks.run --organizations 10000 --products 10000
+    python -m benchmarks.run --organizations 10000 --save-baseline
+
+Для каждого маршрута выводятся перцентили задержки, число запросов к
+базе и пиковая память. Если для этого объема данных есть сохраненный
+базовый замер, скрипт завершается с кодом 1, когда метрика хуже базовой
+больше чем на --tolerance (число запросов сравнивается точно).
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+from urllib.parse import urlencode
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from organizations.models import Organization, Product  # noqa: E402
+from .dataset import seed  # noqa: E402
+from .measure import measure, test_database  # noqa: E402
+
+BASELINE = Path(__file__).with_name("baseline.json")
+TIMING_METRICS = ("p50_ms", "p95_ms", "p99_ms", "peak_memory_kb")
+
+
+def organization_payload(product_ids, price):
+    return {
+        "name": "Предприятие бенчмарка",
+        "description": "Описание",
+        "network": Organization.objects.values_list(
+            "network", flat=True
+        ).first(),
+        "district": [1],
+        "product": [{"id": pk, "price": price} for pk in product_ids],
+    }
+
+
+def get_routes(client, data, page_size):
+    district = data["district"]
+    organization = Organization.objects.order_by("pk").first().pk
+    product_ids = list(
+        Product.objects.order_by("pk").values_list("pk", flat=True)[:20]
+    )
+    payload = organization_payload(product_ids, 10)
+    payload["district"] = [district]
+    prices = itertools.count()
+    filters = urlencode(
+        {
+            "categories": data["category"],
+            "search": "Мол",
+            "page_size": page_size,
+        }
+    )
+    return {
+        "organizations_all:list": lambda: client.get(
+            f"/organizations_all/?page_size={page_size}"
+        ),
+        "organizations_all:detail": lambda: client.get(
+            f"/organizations_all/{organization}/"
+        ),
+        "organizations:list": lambda: client.get(
+            f"/organizations/{district}/?page_size={page_size}"
+        ),
+        "organizations:filtered": lambda: client.get(
+            f"/organizations/{district}/?{filters}"
+        ),
+        "products:list": lambda: client.get(
+            f"/products/?page_size={page_size}"
+        ),
+        "categories:list": lambda: client.get("/categories/"),
+        "districts:list": lambda: client.get("/districts/"),
+        "organizations_all:create": (
+            lambda: client.post(
+                "/organizations_all/", data=payload, format="json"
+            ),
+            201,
+        ),
+        "organizations_all:update": lambda: client.put(
+            f"/organizations_all/{organization}/",
+            data=dict(
+                payload,
+                product=[
+                    {"id": pk, "price": next(prices)} for pk in product_ids
+                ],
+            ),
+            format="json",
+        ),
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for route, metrics in results.items():
+        expected = baseline.get(route)
+        if expected is None:
+            continue
+        if metrics["queries"] > expected["queries"]:
+            failures.append(
+                f"{route}: queries {metrics['queries']} > "
+                f"{expected['queries']}"
+            )
+        for metric in TIMING_METRICS:
+            limit = expected[metric] * (1 + tolerance)
+            if metrics[metric] > limit:
+                failures.append(
+                    f"{route}: {metric} {metrics[metric]} > {limit:.2f}"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--prices", type=int, default=10)
+    parser.add_argument("--districts", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--route", action="append", dest="routes")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--keepdb", action="store_true")
+    args = parser.parse_args()
+
+    with test_database(args.keepdb):
+        data = seed(
+            organizations=args.organizations,
+            products=args.products,
+            prices=args.prices,
+            districts=args.districts,
+        )
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.get_or_create(username="benchmark")[0]
+        )
+        results = {}
+        for route, request in get_routes(client, data, args.page_size).items():
+            if args.routes and route not in args.routes:
+                continue
+            request, status = (
+                request if isinstance(request, tuple) else (request, 200)
+            )
+            results[route] = measure(request, args.repeat, status)
+
+    scale = f"{args.organizations}x{args.products}x{args.prices}"
+    baselines = (
+        json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    )
+    print(json.dumps(
+        {"scale": scale, "dataset": data, "results": results},
+        ensure_ascii=False,
+        indent=2,
+    ))
+    if args.save_baseline:
+        baselines[scale] = dict(baselines.get(scale, {}), **results)
+        args.baseline.write_text(
+            json.dumps(baselines, ensure_ascii=False, indent=2) + "\n"
+        )
+        return
+    failures = compare(results, baselines.get(scale, {}), args.tolerance)
+    if failures:
+        print("Регрессия относительно базового замера:")
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
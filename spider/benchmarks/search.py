@@ -0,0 +1,63 @@
+"""Замер поиска предприятий по названию товара.
+
+Запуск из папки spider (данные создаются в тестовой базе)::
+
+    python -m benchmarks.search --products 1000000 --keepdb
+
+Выводит метрики GET /organizations/{district_id}/?search=... для
+режимов prefix и contains.
+"""
+import argparse
+import json
+import os
+from urllib.parse import urlencode
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from .dataset import seed  # noqa: E402
+from .measure import measure, test_database  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--organizations", type=int, default=2000)
+    parser.add_argument("--prices", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keepdb", action="store_true")
+    args = parser.parse_args()
+
+    with test_database(args.keepdb):
+        data = seed(
+            organizations=args.organizations,
+            products=args.products,
+            prices=args.prices,
+            districts=1,
+        )
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.get_or_create(username="benchmark")[0]
+        )
+        url = f"/organizations/{data['district']}/"
+        results = {}
+        for term in ("Сыр 12", "Мол", "ко 77"):
+            for mode in ("prefix", "contains"):
+                query = urlencode({"search": term, "search_mode": mode})
+                results[f"{mode}:{term}"] = measure(
+                    lambda: client.get(f"{url}?{query}"), args.repeat
+                )
+        print(json.dumps(
+            {"dataset": data, "results": results},
+            ensure_ascii=False,
+            indent=2,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Настройки gunicorn, которые читаются из рабочей папки автоматически.
+
+Метрики воркеров хранятся в файлах PROMETHEUS_MULTIPROC_DIR (api.metrics):
+папка очищается при старте мастера, а файлы завершившегося воркера
+помечаются, чтобы его gauge не попадали в /metrics.
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -44,7 +44,14 @@ class ProductOrganizationAdmin(admin.ModelAdmin):
 
 
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ["id", "name", "description", "network"]
+    list_display = [
+        "id",
+        "name",
+        "description",
+        "network",
+        "count_products",
+        "count_districts",
+    ]
     list_display_links = ["id", "name"]
     search_fields = ["name"]
     inlines = (DistrictsInline, ProductOrganizationInline)
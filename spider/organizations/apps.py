@@ -5,3 +5,6 @@ class OrganizationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "organizations"
     verbose_name = "Предприятия"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,295 @@
+import csv
+import io
+import itertools
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    Organization,
+    OrganizationDistrict,
+    Product,
+    ProductOrganization,
+)
+from organizations.signals import catalog_created, organizations_refreshed
+
+JSONL_FIELDS = {
+    "name": str,
+    "description": str,
+    "network": str,
+    "districts": list,
+    "products": list,
+}
+JSONL_TYPES = {str: "строкой", list: "списком"}
+CSV_FIELDS = (
+    "organization",
+    "description",
+    "network",
+    "districts",
+    "product",
+    "category",
+    "price",
+)
+
+
+def read_jsonl(lines):
+    """Предприятия из JSONL: одна строка - одно предприятие.
+
+    {"name": ..., "description": ..., "network": ..., "districts": [...],
+     "products": [{"name": ..., "category": ..., "price": ...}]}
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f"Строка {number}: {error}")
+        error = jsonl_error(record)
+        if error:
+            raise CommandError(f"Строка {number}: {error}")
+        yield number, record
+
+
+def jsonl_error(record):
+    """Описание первой ошибки в структуре записи JSONL или None."""
+    if not isinstance(record, dict):
+        return "ожидается объект"
+    for field, kind in JSONL_FIELDS.items():
+        if not isinstance(record.get(field), kind):
+            return f"поле {field} должно быть {JSONL_TYPES[kind]}"
+    if not all(isinstance(name, str) for name in record["districts"]):
+        return "поле districts должно быть списком строк"
+    for product in record["products"]:
+        if not isinstance(product, dict):
+            return "товары должны быть объектами"
+        missing = {"name", "category", "price"} - product.keys()
+        if missing:
+            return f"у товара нет полей: {', '.join(sorted(missing))}"
+        for field in ("name", "category"):
+            if not isinstance(product[field], str):
+                return f"поле {field} товара должно быть строкой"
+    return None
+
+
+def read_csv(lines):
+    """Предприятия из CSV: одна строка - одна цена.
+
+    Строки одного предприятия (organization, description, network) идут
+    подряд, районы перечисляются через ";". Строка с пустым product
+    задает предприятие без товаров.
+    """
+    reader = csv.DictReader(lines)
+    missing = set(CSV_FIELDS) - set(reader.fieldnames or ())
+    if missing:
+        raise CommandError(f"В CSV нет колонок: {', '.join(sorted(missing))}")
+    rows = ((reader.line_num - 1, row) for row in reader)
+    for (name, description, network), group in itertools.groupby(
+        rows, csv_organization
+    ):
+        group = list(group)
+        yield group[-1][0], {
+            "name": name,
+            "description": description,
+            "network": network,
+            "districts": [
+                district.strip()
+                for district in group[0][1]["districts"].split(";")
+                if district.strip()
+            ],
+            "products": [
+                {
+                    "name": row["product"],
+                    "category": row["category"],
+                    "price": row["price"],
+                }
+                for _, row in group
+                if row["product"]
+            ],
+        }
+
+
+def csv_organization(item):
+    _, row = item
+    return row["organization"], row["description"], row["network"]
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоковая загрузка предприятий, товаров и цен из JSONL или CSV. "
+        "Справочники сопоставляются по названию через словари в памяти, "
+        "записи пишутся пачками (COPY на PostgreSQL), после каждой пачки "
+        "сохраняется контрольная точка для --resume. Кеш API сбрасывается "
+        "сигналами после фиксации каждой пачки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--format", choices=READERS)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--checkpoint", type=Path)
+        parser.add_argument("--resume", action="store_true")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".")
+        if file_format not in READERS:
+            raise CommandError("Укажите формат файла: --format jsonl|csv")
+        checkpoint = options["checkpoint"] or path.with_name(
+            path.name + ".checkpoint"
+        )
+        position = 0
+        if options["resume"] and checkpoint.exists():
+            position = json.loads(checkpoint.read_text())["position"]
+        self.load_references()
+
+        total = 0
+        with path.open(encoding="utf-8", newline="") as lines:
+            records = (
+                (number, record)
+                for number, record in READERS[file_format](lines)
+                if number > position
+            )
+            while True:
+                batch = list(itertools.islice(records, options["batch_size"]))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    self.write_batch(batch)
+                position = batch[-1][0]
+                checkpoint.write_text(json.dumps({"position": position}))
+                total += len(batch)
+                self.stdout.write(f"Загружено предприятий: {total}")
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(f"Готово: {total}"))
+
+    def load_references(self):
+        self.categories = dict(Category.objects.values_list("name", "pk"))
+        self.districts = dict(District.objects.values_list("name", "pk"))
+        self.networks = dict(
+            NetworkOrganization.objects.values_list("name", "pk")
+        )
+        self.products = {
+            (name, category): pk
+            for pk, name, category in Product.objects.values_list(
+                "pk", "name", "category"
+            )
+        }
+
+    def resolve(self, mapping, model, names, **fields):
+        """Создает недостающие записи справочника одной вставкой."""
+        missing = {name for name in names if name not in mapping}
+        if missing:
+            created = model.objects.bulk_create(
+                model(name=name, **fields) for name in sorted(missing)
+            )
+            mapping.update((item.name, item.pk) for item in created)
+            catalog_created.send(sender=model)
+
+    def write_batch(self, batch):
+        records = [record for _, record in batch]
+        products = [
+            product for record in records for product in record["products"]
+        ]
+        self.resolve(
+            self.networks,
+            NetworkOrganization,
+            {record["network"] for record in records},
+        )
+        self.resolve(
+            self.districts,
+            District,
+            {name for record in records for name in record["districts"]},
+        )
+        self.resolve(
+            self.categories,
+            Category,
+            {product["category"] for product in products},
+        )
+        missing = {
+            (product["name"], self.categories[product["category"]])
+            for product in products
+        } - self.products.keys()
+        if missing:
+            created = Product.objects.bulk_create(
+                Product(name=name, category_id=category)
+                for name, category in sorted(missing)
+            )
+            self.products.update(
+                ((item.name, item.category_id), item.pk) for item in created
+            )
+            catalog_created.send(sender=Product)
+
+        organizations = Organization.objects.bulk_create(
+            Organization(
+                name=record["name"],
+                description=record["description"],
+                network_id=self.networks[record["network"]],
+            )
+            for record in records
+        )
+        district_rows = set()
+        price_rows = {}
+        for (number, record), organization in zip(batch, organizations):
+            for name in record["districts"]:
+                district_rows.add((self.districts[name], organization.pk))
+            for product in record["products"]:
+                price = self.parse_price(number, product["price"])
+                product_id = self.products[
+                    (product["name"], self.categories[product["category"]])
+                ]
+                price_rows[(product_id, organization.pk)] = price
+        self.copy(
+            OrganizationDistrict,
+            ("district_id", "organization_id"),
+            sorted(district_rows),
+        )
+        self.copy(
+            ProductOrganization,
+            ("product_id", "organization_id", "price"),
+            [key + (price,) for key, price in price_rows.items()],
+        )
+        ids = [organization.pk for organization in organizations]
+        Organization.objects.filter(pk__in=ids).refresh_counters()
+        # Кеш сбрасывается при фиксации этой пачки, поэтому ошибка в
+        # следующих пачках не оставляет устаревших ответов.
+        organizations_refreshed.send(sender=Organization, organization_ids=ids)
+
+    def parse_price(self, number, value):
+        try:
+            price = int(value)
+        except (TypeError, ValueError):
+            price = -1
+        if price < 0:
+            raise CommandError(
+                f"Запись {number}: цена должна быть целым числом >= 0, "
+                f"получено {value!r}"
+            )
+        return price
+
+    def copy(self, model, columns, rows):
+        if not rows:
+            return
+        if connection.vendor != "postgresql":
+            model.objects.bulk_create(
+                (model(**dict(zip(columns, row))) for row in rows),
+                batch_size=1000,
+            )
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {model._meta.db_table} ({', '.join(columns)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from organizations.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает строки DistrictOrganizationSummary всех предприятий "
+        "пачками по --batch-size, например после загрузки данных в обход "
+        "ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        pks = list(
+            Organization.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        batch_size = options["batch_size"]
+        for start in range(0, len(pks), batch_size):
+            with transaction.atomic():
+                Organization.objects.filter(
+                    pk__in=pks[start:start + batch_size]
+                ).refresh_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано предприятий: {len(pks)}")
+        )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from organizations.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Находит предприятия, у которых count_products или count_districts "
+        "разошлись с фактическим числом связей или строки "
+        "DistrictOrganizationSummary - со связями и ценами, и с --fix "
+        "пересчитывает их. Полная пересборка строк районов - команда "
+        "rebuild_district_summaries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true")
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        drifted = list(
+            Organization.objects.with_drifted_counters()
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        pks = list(
+            Organization.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        summaries = []
+        for start in range(0, len(pks), batch_size):
+            summaries.extend(
+                Organization.objects.filter(
+                    pk__in=pks[start:start + batch_size]
+                ).drifted_summaries()
+            )
+        if not drifted and not summaries:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+            return
+        for title, pks in (
+            ("Расхождения счетчиков", drifted),
+            ("Расхождения строк районов", summaries),
+        ):
+            if pks:
+                sample = ", ".join(map(str, pks[:20]))
+                self.stdout.write(
+                    f"{title} у {len(pks)} предприятий: {sample}"
+                )
+        if not options["fix"]:
+            return
+        fixed = sorted(set(drifted) | set(summaries))
+        for start in range(0, len(fixed), batch_size):
+            Organization.objects.filter(
+                pk__in=fixed[start:start + batch_size]
+            ).refresh_counters()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено: {len(fixed)}"))
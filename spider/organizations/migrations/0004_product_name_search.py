@@ -0,0 +1,57 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:43
+
+import django.core.validators
+from django.db import migrations, models
+
+# Django приводит поле к text и сравнивает UPPER(name::text) для
+# istartswith/icontains, поэтому индексы строятся по тому же выражению.
+CREATE_INDEXES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS organizations_product_name_prefix_idx "
+    "ON organizations_product (UPPER(name::text) text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS organizations_product_name_trgm_idx "
+    "ON organizations_product USING gin (UPPER(name::text) gin_trgm_ops)",
+)
+
+DROP_INDEXES = (
+    "DROP INDEX IF EXISTS organizations_product_name_trgm_idx",
+    "DROP INDEX IF EXISTS organizations_product_name_prefix_idx",
+)
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "organizations",
+            "0003_alter_category_options_alter_district_options_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productorganization",
+            name="price",
+            field=models.IntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(
+                        0, "Цена товара должна быть больше или равна нулю!"
+                    )
+                ],
+                verbose_name="Цена",
+            ),
+        ),
+        migrations.RunPython(
+            run_postgresql(CREATE_INDEXES), run_postgresql(DROP_INDEXES)
+        ),
+    ]
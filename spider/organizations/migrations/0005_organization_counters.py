@@ -0,0 +1,53 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model):
+    rows = (
+        model.objects.filter(organization=OuterRef("pk"))
+        .order_by()
+        .values("organization")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Organization = apps.get_model("organizations", "Organization")
+    Organization.objects.update(
+        count_products=count_subquery(
+            apps.get_model("organizations", "ProductOrganization")
+        ),
+        count_districts=count_subquery(
+            apps.get_model("organizations", "OrganizationDistrict")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0004_product_name_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organization",
+            name="count_districts",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество районов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="count_products",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество товаров"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model):
+    rows = (
+        model.objects.filter(organization=OuterRef("pk"))
+        .order_by()
+        .values("organization")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет последнюю из повторяющихся связей перед UNIQUE."""
+    Organization = apps.get_model("organizations", "Organization")
+    OrganizationDistrict = apps.get_model(
+        "organizations", "OrganizationDistrict"
+    )
+    ProductOrganization = apps.get_model(
+        "organizations", "ProductOrganization"
+    )
+    organization_ids = set()
+    for model, field in (
+        (OrganizationDistrict, "district"),
+        (ProductOrganization, "product"),
+    ):
+        duplicates = (
+            model.objects.values("organization", field)
+            .annotate(keep=Max("pk"), rows=Count("pk"))
+            .filter(rows__gt=1)
+            .order_by()
+        )
+        for duplicate in duplicates.iterator():
+            model.objects.filter(
+                organization=duplicate["organization"],
+                **{field: duplicate[field]},
+            ).exclude(pk=duplicate["keep"]).delete()
+            organization_ids.add(duplicate["organization"])
+    Organization.objects.filter(pk__in=organization_ids).update(
+        count_products=count_subquery(ProductOrganization),
+        count_districts=count_subquery(OrganizationDistrict),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0005_organization_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="organizationdistrict",
+            constraint=models.UniqueConstraint(
+                fields=("district", "organization"),
+                name="organization_district_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productorganization",
+            constraint=models.UniqueConstraint(
+                fields=("organization", "product"),
+                include=("price",),
+                name="product_organization_unique",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productorganization",
+            index=models.Index(
+                fields=["product", "price"],
+                name="product_organization_price",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="organizationdistrict",
+            name="district",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="organization_districts",
+                to="organizations.district",
+                verbose_name="Район города",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productorganization",
+            name="organization",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="product_organizations",
+                to="organizations.organization",
+                verbose_name="Предприятие",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0006_relation_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productorganization",
+            index=models.Index(
+                fields=["organization", "price"],
+                name="organization_price",
+            ),
+        ),
+    ]
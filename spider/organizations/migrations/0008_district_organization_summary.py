@@ -0,0 +1,164 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:39
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+# Предприятий в пачке: память заполнения не растет вместе с таблицей.
+BATCH_SIZE = 10000
+
+
+def fill_summaries(apps, schema_editor):
+    Organization = apps.get_model("organizations", "Organization")
+    Summary = apps.get_model("organizations", "DistrictOrganizationSummary")
+    organizations = Organization.objects.order_by("pk").values_list(
+        "pk", flat=True
+    )
+    last = None
+    while True:
+        batch = organizations
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        pks = list(batch[:BATCH_SIZE])
+        if not pks:
+            break
+        last = pks[-1]
+        Summary.objects.bulk_create(
+            batch_summaries(apps, pks[0], last), batch_size=1000
+        )
+
+
+def batch_summaries(apps, first, last):
+    """Строки районов предприятий с pk от first до last включительно."""
+    OrganizationDistrict = apps.get_model(
+        "organizations", "OrganizationDistrict"
+    )
+    ProductOrganization = apps.get_model(
+        "organizations", "ProductOrganization"
+    )
+    Summary = apps.get_model("organizations", "DistrictOrganizationSummary")
+    rows = ProductOrganization.objects.filter(
+        organization__gte=first, organization__lte=last
+    ).order_by()
+    prices = {
+        row["organization"]: row
+        for row in rows.values("organization").annotate(
+            count_products=Count("pk"),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+    }
+    categories = defaultdict(list)
+    for organization_id, category_id in (
+        rows.values_list("organization", "product__category")
+        .distinct()
+        .order_by("product__category_id")
+    ):
+        categories[organization_id].append(category_id)
+    links = OrganizationDistrict.objects.filter(
+        organization__gte=first, organization__lte=last
+    ).values_list("district", "organization")
+    for district_id, organization_id in links.iterator():
+        row = prices.get(organization_id, {})
+        yield Summary(
+            district_id=district_id,
+            organization_id=organization_id,
+            count_products=row.get("count_products", 0),
+            min_price=row.get("min_price", 0),
+            max_price=row.get("max_price", 0),
+            categories=categories[organization_id],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organizations", "0007_organization_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DistrictOrganizationSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "count_products",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество товаров"
+                    ),
+                ),
+                (
+                    "min_price",
+                    models.IntegerField(
+                        default=0, verbose_name="Минимальная цена"
+                    ),
+                ),
+                (
+                    "max_price",
+                    models.IntegerField(
+                        default=0, verbose_name="Максимальная цена"
+                    ),
+                ),
+                (
+                    "categories",
+                    models.JSONField(default=list, verbose_name="Категории"),
+                ),
+                (
+                    "district",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="organization_summaries",
+                        to="organizations.district",
+                        verbose_name="Район города",
+                    ),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="district_summaries",
+                        to="organizations.organization",
+                        verbose_name="Предприятие",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Предприятие района",
+                "verbose_name_plural": "Предприятия районов",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="districtorganizationsummary",
+            index=models.Index(
+                fields=["district", "min_price"],
+                name="district_summary_min_price",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="districtorganizationsummary",
+            index=models.Index(
+                fields=["district", "max_price"],
+                name="district_summary_max_price",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="districtorganizationsummary",
+            constraint=models.UniqueConstraint(
+                fields=("district", "organization"),
+                name="district_summary_unique",
+            ),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,21 @@
+from collections import defaultdict
+
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    FilteredRelation,
+    IntegerField,
+    Max,
+    Min,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
 
 ERROR_PRICE = "Цена товара должна быть больше или равна нулю!"
 
@@ -58,6 +74,196 @@ class Product(models.Model):
         return f"{self.name} - {self.category}"
 
 
+def count_subquery(model):
+    """Подзапрос с количеством строк model, относящихся к предприятию."""
+    rows = (
+        model.objects.filter(organization=OuterRef("pk"))
+        .order_by()
+        .values("organization")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+COUNTER_FIELDS = ("count_products", "count_districts")
+SUMMARY_FIELDS = {
+    field: f"summary_{field}"
+    for field in ("count_products", "min_price", "max_price", "categories")
+}
+
+
+def summary_rows(organization_ids):
+    """Строки DistrictOrganizationSummary по фактическим связям и ценам.
+
+    Возвращает {(id района, id предприятия): значения SUMMARY_FIELDS};
+    цены и категории читаются запросами с группировкой.
+    """
+    rows = ProductOrganization.objects.filter(
+        organization__in=organization_ids
+    ).order_by()
+    prices = {
+        row.pop("organization"): row
+        for row in rows.values("organization").annotate(
+            count_products=Count("pk"),
+            min_price=Min("price"),
+            max_price=Max("price"),
+        )
+    }
+    categories = defaultdict(list)
+    for organization_id, category_id in (
+        rows.values_list("organization", "product__category")
+        .distinct()
+        .order_by("product__category_id")
+    ):
+        categories[organization_id].append(category_id)
+    links = OrganizationDistrict.objects.filter(
+        organization__in=organization_ids
+    ).values_list("district", "organization")
+    empty = {"count_products": 0, "min_price": 0, "max_price": 0}
+    return {
+        (district_id, organization_id): {
+            **prices.get(organization_id, empty),
+            "categories": categories[organization_id],
+        }
+        for district_id, organization_id in links
+    }
+
+
+class OrganizationQuerySet(models.QuerySet):
+    def for_read(self):
+        """Выборка со всеми связями, которые выводит OrganizationSerializer.
+
+        Количество запросов не зависит от числа предприятий: сеть
+        подтягивается JOIN-ом, районы и товары - по одному запросу
+        prefetch.
+        """
+        return self.select_related("network").prefetch_related(
+            "district",
+            Prefetch(
+                "product_organizations",
+                queryset=ProductOrganization.objects.select_related(
+                    "product__category"
+                ).order_by("pk"),
+            ),
+        )
+
+    def in_district(self, district_id):
+        """Предприятия района по строкам DistrictOrganizationSummary.
+
+        Колонки строки района доступны как псевдонимы SUMMARY_FIELDS:
+        фильтры и сортировка по ценам, числу товаров и категориям читают
+        их из той же строки, а не подзапросами по товарам, и выборка
+        района идет по индексу (district, organization). Условия нужно
+        ставить на псевдонимы: filter() по district_summary__... добавил
+        бы еще один JOIN.
+        """
+        return (
+            self.alias(
+                district_summary=FilteredRelation(
+                    "district_summaries",
+                    condition=Q(district_summaries__district=district_id),
+                )
+            )
+            .filter(district_summary__isnull=False)
+            .alias(
+                **{
+                    alias: F(f"district_summary__{field}")
+                    for field, alias in SUMMARY_FIELDS.items()
+                }
+            )
+        )
+
+    def refresh_counters(self):
+        """Пересчитывает count_products и count_districts одним UPDATE.
+
+        Вместе со счетчиками пересобираются строки
+        DistrictOrganizationSummary, поэтому все пути записи, которые
+        вызывают refresh_counters, поддерживают их в актуальном виде.
+        """
+        updated = self.update(
+            count_products=count_subquery(ProductOrganization),
+            count_districts=count_subquery(OrganizationDistrict),
+        )
+        self.refresh_summaries()
+        return updated
+
+    def refresh_summaries(self):
+        """Пересобирает строки DistrictOrganizationSummary предприятий.
+
+        Сначала предприятия блокируются SELECT ... FOR UPDATE в порядке
+        pk, поэтому параллельные пересборки одного предприятия (например,
+        две записи цен) идут по очереди. Строки связей записываются
+        upsert-ом по (district, organization), удаляются только строки
+        исчезнувших связей. Число запросов не зависит от числа
+        предприятий.
+        """
+        with transaction.atomic(savepoint=False):
+            ids = list(
+                Organization.objects.filter(pk__in=self.values("pk"))
+                .order_by("pk")
+                .select_for_update()
+                .values_list("pk", flat=True)
+            )
+            if not ids:
+                return
+            DistrictOrganizationSummary.objects.filter(
+                organization__in=ids
+            ).exclude(
+                Exists(
+                    OrganizationDistrict.objects.filter(
+                        organization=OuterRef("organization"),
+                        district=OuterRef("district"),
+                    )
+                )
+            ).delete()
+            DistrictOrganizationSummary.objects.bulk_create(
+                (
+                    DistrictOrganizationSummary(
+                        district_id=district_id,
+                        organization_id=organization_id,
+                        **values,
+                    )
+                    for (district_id, organization_id), values in (
+                        summary_rows(ids).items()
+                    )
+                ),
+                batch_size=1000,
+                update_conflicts=True,
+                # Django 4.1 подставляет в ON CONFLICT имена полей, а не
+                # колонок, поэтому внешние ключи передаются как attname.
+                unique_fields=["district_id", "organization_id"],
+                update_fields=list(SUMMARY_FIELDS),
+            )
+
+    def drifted_summaries(self):
+        """id предприятий, чьи строки районов разошлись с фактическими."""
+        ids = list(self.values_list("pk", flat=True))
+        expected = summary_rows(ids)
+        actual = {
+            (row.pop("district"), row.pop("organization")): row
+            for row in DistrictOrganizationSummary.objects.filter(
+                organization__in=ids
+            ).values("district", "organization", *SUMMARY_FIELDS)
+        }
+        drifted = {
+            key[1]
+            for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        }
+        return sorted(drifted)
+
+    def with_drifted_counters(self):
+        """Предприятия, у которых счетчики разошлись с фактическими."""
+        return self.alias(
+            actual_products=count_subquery(ProductOrganization),
+            actual_districts=count_subquery(OrganizationDistrict),
+        ).exclude(
+            count_products=F("actual_products"),
+            count_districts=F("actual_districts"),
+        )
+
+
 class Organization(models.Model):
     name = models.CharField("Название", max_length=150)
     description = models.CharField("Описание", max_length=1000)
@@ -69,6 +275,14 @@ class Organization(models.Model):
     )
     district = models.ManyToManyField(District, through="OrganizationDistrict")
     product = models.ManyToManyField(Product, through="ProductOrganization")
+    count_products = models.PositiveIntegerField(
+        "Количество товаров", default=0, editable=False
+    )
+    count_districts = models.PositiveIntegerField(
+        "Количество районов", default=0, editable=False
+    )
+
+    objects = OrganizationQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pk"]
@@ -78,13 +292,27 @@ class Organization(models.Model):
     def __str__(self):
         return f"{self.name} - {self.description}"
 
+    def save(self, *args, **kwargs):
+        # Счетчики меняются только через refresh_counters, чтобы обычное
+        # сохранение не затерло их значениями, прочитанными раньше.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class OrganizationDistrict(models.Model):
+    # Отдельный индекс не нужен: district - первая колонка уникального
+    # индекса (district, organization).
     district = models.ForeignKey(
         District,
         on_delete=models.CASCADE,
         related_name="organization_districts",
         verbose_name="Район города",
+        db_index=False,
     )
     organization = models.ForeignKey(
         Organization,
@@ -95,6 +323,12 @@ class OrganizationDistrict(models.Model):
     class Meta:
         verbose_name = "Расположение предприятия"
         verbose_name_plural = "Расположение предприятий"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["district", "organization"],
+                name="organization_district_unique",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.district}"
@@ -107,11 +341,14 @@ class ProductOrganization(models.Model):
         related_name="product_organizations",
         verbose_name="Товар/Услуга",
     )
+    # Отдельный индекс не нужен: organization - первая колонка
+    # уникального индекса (organization, product).
     organization = models.ForeignKey(
         Organization,
         on_delete=models.CASCADE,
         related_name="product_organizations",
         verbose_name="Предприятие",
+        db_index=False,
     )
     price = models.IntegerField(
         "Цена", validators=[MinValueValidator(0, ERROR_PRICE)]
@@ -120,6 +357,80 @@ class ProductOrganization(models.Model):
     class Meta:
         verbose_name = "Товары предприятия"
         verbose_name_plural = "Товары предприятий"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["organization", "product"],
+                include=["price"],
+                name="product_organization_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["product", "price"],
+                name="product_organization_price",
+            ),
+            # Крайние цены предприятия для фильтров и сортировки по цене.
+            models.Index(
+                fields=["organization", "price"],
+                name="organization_price",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product}"
+
+
+class DistrictOrganizationSummary(models.Model):
+    """Предприятие в районе с готовыми данными для списка района.
+
+    Строка на каждую связь OrganizationDistrict: число товаров, крайние
+    цены (0, если цен нет, как в сортировке по цене) и отсортированный
+    список id категорий товаров. Строки пересобирает
+    OrganizationQuerySet.refresh_summaries, целиком - команда
+    rebuild_district_summaries.
+    """
+
+    # Отдельный индекс не нужен: district - первая колонка уникального
+    # индекса (district, organization).
+    district = models.ForeignKey(
+        District,
+        on_delete=models.CASCADE,
+        related_name="organization_summaries",
+        verbose_name="Район города",
+        db_index=False,
+    )
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="district_summaries",
+        verbose_name="Предприятие",
+    )
+    count_products = models.PositiveIntegerField(
+        "Количество товаров", default=0
+    )
+    min_price = models.IntegerField("Минимальная цена", default=0)
+    max_price = models.IntegerField("Максимальная цена", default=0)
+    categories = models.JSONField("Категории", default=list)
+
+    class Meta:
+        verbose_name = "Предприятие района"
+        verbose_name_plural = "Предприятия районов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["district", "organization"],
+                name="district_summary_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["district", "min_price"],
+                name="district_summary_min_price",
+            ),
+            models.Index(
+                fields=["district", "max_price"],
+                name="district_summary_max_price",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.district} - {self.organization}"
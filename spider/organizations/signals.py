@@ -0,0 +1,162 @@
+import threading
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from .models import (
+    District,
+    Organization,
+    OrganizationDistrict,
+    Product,
+    ProductOrganization,
+)
+
+RELATED_FIELDS = {
+    OrganizationDistrict: "district",
+    ProductOrganization: "product",
+}
+RELATION_MODELS = {
+    District: OrganizationDistrict,
+    Product: ProductOrganization,
+}
+
+
+# Счетчики и строки районов предприятий обновлены вне запроса, который
+# их поменял: аргумент organization_ids. Кеш ответов сбрасывает api.
+organizations_refreshed = Signal()
+
+# Записи справочника sender созданы в обход save(), например пачкой
+# bulk_create при загрузке каталога.
+catalog_created = Signal()
+
+# Предприятия, связи которых менялись в текущей транзакции. Пересчет идет
+# один раз после фиксации, а не на каждую строку связи; после отката
+# лишние id пересчитаются со следующей фиксацией, что безопасно.
+_pending = threading.local()
+
+
+def get_pending():
+    if not hasattr(_pending, "value"):
+        _pending.value = {"counters": set(), "summaries": set()}
+    return _pending.value
+
+
+def refresh_counters(organization_ids):
+    """Пересчитывает счетчики и строки районов после фиксации транзакции."""
+    get_pending()["counters"].update(organization_ids)
+    transaction.on_commit(flush_refresh)
+
+
+def refresh_summaries(organization_ids):
+    get_pending()["summaries"].update(organization_ids)
+    transaction.on_commit(flush_refresh)
+
+
+def flush_refresh():
+    pending = getattr(_pending, "value", None)
+    if pending is None:
+        return
+    del _pending.value
+    counters = pending["counters"]
+    summaries = pending["summaries"] - counters
+    if counters:
+        Organization.objects.filter(pk__in=counters).refresh_counters()
+    if summaries:
+        Organization.objects.filter(pk__in=summaries).refresh_summaries()
+    # Сброс кеша по тем же связям мог пройти при фиксации раньше
+    # пересчета, поэтому кеш сбрасывается еще раз.
+    organizations_refreshed.send(
+        sender=Organization, organization_ids=counters | summaries
+    )
+
+
+def related_organizations(model, instance):
+    return set(
+        model.objects.filter(
+            **{RELATED_FIELDS[model]: instance}
+        ).values_list("organization", flat=True)
+    )
+
+
+@receiver(post_save, sender=OrganizationDistrict)
+@receiver(post_save, sender=ProductOrganization)
+def relation_saved(sender, instance, created, **kwargs):
+    if created:
+        refresh_counters([instance.organization_id])
+    else:
+        # Изменились цена или район: счетчики те же, а строки районов
+        # устарели.
+        refresh_summaries([instance.organization_id])
+
+
+@receiver(post_delete, sender=OrganizationDistrict)
+@receiver(post_delete, sender=ProductOrganization)
+def relation_deleted(sender, instance, origin=None, **kwargs):
+    """Связь удалена напрямую, а не каскадом от предприятия или товара.
+
+    Каскад от Product и District пересчитывается один раз в
+    relation_target_deleted, у удаленного предприятия считать нечего.
+    """
+    if isinstance(origin, QuerySet):
+        origin = origin.model
+    elif origin is not None:
+        origin = type(origin)
+    if origin in (None, sender):
+        refresh_counters([instance.organization_id])
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    """Запоминает прежнюю категорию товара для строк районов."""
+    if instance.pk is None:
+        return
+    instance._old_category_id = (
+        Product.objects.filter(pk=instance.pk)
+        .values_list("category", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    old_category_id = getattr(instance, "_old_category_id", None)
+    if created or old_category_id in (None, instance.category_id):
+        return
+    refresh_summaries(related_organizations(ProductOrganization, instance))
+
+
+@receiver(pre_delete, sender=District)
+@receiver(pre_delete, sender=Product)
+def relation_target_deleting(sender, instance, **kwargs):
+    instance._organization_ids = related_organizations(
+        RELATION_MODELS[sender], instance
+    )
+
+
+@receiver(post_delete, sender=District)
+@receiver(post_delete, sender=Product)
+def relation_target_deleted(sender, instance, **kwargs):
+    refresh_counters(getattr(instance, "_organization_ids", ()))
+
+
+@receiver(m2m_changed, sender=OrganizationDistrict)
+@receiver(m2m_changed, sender=ProductOrganization)
+def relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._organization_ids = related_organizations(sender, instance)
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        refresh_counters([instance.pk])
+    elif action == "post_clear":
+        refresh_counters(instance._organization_ids)
+    else:
+        refresh_counters(pk_set)
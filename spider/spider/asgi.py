@@ -9,8 +9,60 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spider.settings")
 
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Отправляет AsyncStreamingHttpResponse через async for.
+
+    Остальные ответы отправляет ASGIHandler Django.
+    """
+
+    async def send_response(self, response, send):
+        from api.streaming import AsyncStreamingHttpResponse
+
+        if not isinstance(response, AsyncStreamingHttpResponse):
+            return await super().send_response(response, send)
+        headers = [
+            (
+                header.encode("ascii"),
+                value.encode("latin1") if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+            for cookie in response.cookies.values()
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        try:
+            async for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": True,
+                        }
+                    )
+            await send({"type": "http.response.body"})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ASGIHandler()
+
+
 application = get_asgi_application()
@@ -0,0 +1,117 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from .creation import DatabaseCreation
+from .pool import ConnectionPool, PoolTimeout
+
+Database = base.Database
+
+POOL_DEFAULTS = {
+    "MIN_SIZE": 0,
+    "MAX_SIZE": 10,
+    "TIMEOUT": 30,
+    "MAX_LIFETIME": 3600,
+    "CHECK_INTERVAL": 30,
+}
+
+# Пулы процесса по alias и параметрам подключения. В ключ входит pid:
+# после fork воркер не должен делить сокеты с родителем.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    if connection.closed:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return True
+
+
+def reset_connection(connection):
+    """Откатывает незавершенную транзакцию перед возвратом в пул."""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+def pool_stats():
+    """Статистика всех пулов текущего процесса по alias."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {
+        key[1]: pool.stats() for key, pool in pools if key[0] == os.getpid()
+    }
+
+
+def close_pools(database):
+    """Закрывает и забывает пулы процесса к базе database."""
+    with _pools_lock:
+        keys = [key for key in _pools if ("database", database) in key[2]]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Django по-прежнему открывает соединение на первый запрос и закрывает
+    его в конце HTTP-запроса (CONN_MAX_AGE = 0), но открытие берет готовое
+    соединение из пула, а закрытие возвращает его обратно. Параметры пула
+    задаются словарем POOL в настройках базы, см. POOL_DEFAULTS.
+    """
+
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        params = conn_params.items()
+        key = (
+            os.getpid(),
+            self.alias,
+            tuple(sorted((name, str(value)) for name, value in params)),
+        )
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is not None:
+                return pool
+            options = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+            pool = ConnectionPool(
+                connect=lambda: base.DatabaseWrapper.get_new_connection(
+                    self, conn_params
+                ),
+                check=check_connection,
+                reset=reset_connection,
+                min_size=options["MIN_SIZE"],
+                max_size=options["MAX_SIZE"],
+                timeout=options["TIMEOUT"],
+                max_lifetime=options["MAX_LIFETIME"],
+                check_interval=options["CHECK_INTERVAL"],
+            )
+            _pools[key] = pool
+        pool.fill()
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        try:
+            connection = self.pool.acquire()
+        except PoolTimeout as error:
+            raise Database.OperationalError(str(error)) from error
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
@@ -0,0 +1,197 @@
+"""Пул соединений с БД, не зависящий от драйвера.
+
+Соединения создает, проверяет и закрывает переданный код, поэтому пул
+одинаково работает с psycopg2 и с поддельными соединениями в тестах.
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Свободное соединение не появилось за timeout секунд."""
+
+
+class ConnectionPool:
+    """Потокобезопасный пул от min_size до max_size соединений.
+
+    connect() открывает соединение, check(connection) проверяет, что
+    простаивавшее дольше check_interval секунд соединение живо, reset
+    (connection) готовит возвращенное соединение к повторной выдаче, а
+    close(connection) закрывает его. check и reset возвращают False для
+    соединений, которые нужно выбросить. Соединения старше max_lifetime
+    секунд закрываются при возврате в пул.
+    """
+
+    def __init__(
+        self,
+        connect,
+        check=None,
+        reset=None,
+        close=None,
+        min_size=0,
+        max_size=10,
+        timeout=30,
+        max_lifetime=3600,
+        check_interval=30,
+        clock=time.monotonic,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Нужно 0 <= min_size <= max_size и max_size > 0")
+        self.connect = connect
+        self.check = check or (lambda connection: True)
+        self.reset = reset or (lambda connection: True)
+        self.close_connection = close or (
+            lambda connection: connection.close()
+        )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.clock = clock
+        self.condition = threading.Condition()
+        # Свободные соединения: (соединение, время возврата в пул).
+        self.idle = deque()
+        self.created_at = {}
+        self.size = 0
+        self.waiting = 0
+        self.counters = {
+            "acquired": 0,
+            "created": 0,
+            "discarded": 0,
+            "timeouts": 0,
+        }
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+
+    def fill(self):
+        """Открывает соединения до min_size."""
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            connection = self.create()
+            self.put_idle(connection)
+
+    def acquire(self):
+        start = self.clock()
+        deadline = start + self.timeout
+        while True:
+            connection, idle_since = self.checkout(deadline)
+            if connection is None:
+                connection = self.create()
+                break
+            if (
+                self.clock() - idle_since < self.check_interval
+                or self.safe_call(self.check, connection)
+            ):
+                break
+            self.discard(connection)
+        elapsed = self.clock() - start
+        with self.condition:
+            self.counters["acquired"] += 1
+            self.acquire_time_total += elapsed
+            self.acquire_time_max = max(self.acquire_time_max, elapsed)
+        return connection
+
+    def release(self, connection):
+        expired = (
+            self.clock() - self.created_at[id(connection)]
+            >= self.max_lifetime
+        )
+        if expired or not self.safe_call(self.reset, connection):
+            self.discard(connection)
+        else:
+            self.put_idle(connection)
+
+    def checkout(self, deadline):
+        """Свободное соединение или (None, None), если нужно открыть новое.
+
+        Место под новое соединение резервируется сразу, а само соединение
+        открывается вне блокировки, чтобы медленное подключение не
+        задерживало остальные потоки.
+        """
+        with self.condition:
+            self.waiting += 1
+            try:
+                while True:
+                    if self.idle:
+                        # LIFO: первыми выдаются недавно работавшие
+                        # соединения, а лишние дольше простаивают.
+                        return self.idle.pop()
+                    if self.size < self.max_size:
+                        self.size += 1
+                        return None, None
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Нет свободного соединения за {self.timeout} с "
+                            f"(занято {self.size} из {self.max_size})"
+                        )
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+    def create(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created_at[id(connection)] = self.clock()
+            self.counters["created"] += 1
+        return connection
+
+    def put_idle(self, connection):
+        with self.condition:
+            self.idle.append((connection, self.clock()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        with self.condition:
+            self.created_at.pop(id(connection), None)
+            self.size -= 1
+            self.counters["discarded"] += 1
+            self.condition.notify()
+        self.safe_call(self.close_connection, connection)
+
+    @staticmethod
+    def safe_call(function, connection):
+        try:
+            return function(connection)
+        except Exception:
+            return False
+
+    def close(self):
+        """Закрывает свободные соединения; занятые закроются при возврате."""
+        with self.condition:
+            idle = [connection for connection, _ in self.idle]
+            self.idle.clear()
+            self.max_lifetime = 0
+        for connection in idle:
+            self.discard(connection)
+
+    def stats(self):
+        with self.condition:
+            acquired = self.counters["acquired"]
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "waiting": self.waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self.counters,
+                "acquire_ms_avg": round(
+                    self.acquire_time_total / acquired * 1000, 3
+                )
+                if acquired
+                else 0,
+                "acquire_ms_max": round(self.acquire_time_max * 1000, 3),
+            }
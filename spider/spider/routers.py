@@ -0,0 +1,50 @@
+"""Маршрутизация чтения на реплики PostgreSQL.
+
+Чтение уходит на реплику, только если код явно включил use_replica (см.
+api.replicas.ReplicaReadMixin); все остальное, включая любые записи,
+работает с default. Пользователь, который только что записал данные,
+закрепляется за default на DATABASE_REPLICA_LAG секунд, чтобы сразу
+видеть свои изменения.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = "default"
+PIN_KEY = "db:pin:{}"
+
+use_replica = ContextVar("use_replica", default=False)
+
+
+def pin_primary(user):
+    if user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), True, settings.DATABASE_REPLICA_LAG)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(PIN_KEY.format(user.pk), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_replica.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django пишет туда, откуда прочитан объект, то
+        # есть и в реплику.
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
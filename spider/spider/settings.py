@@ -7,7 +7,7 @@ SECRET_KEY = (
     "django-insecure-+q(bri)4c84r(^fwgd&1(wr)3h$n$hg&c@@sh+864jea_^47za"
 )
 
-DEBUG = True
+DEBUG = os.getenv("DEBUG", default="False") == "True"
 
 ALLOWED_HOSTS = ["*"]
 
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -66,16 +67,113 @@ WSGI_APPLICATION = "spider.wsgi.application"
 DATABASES = {
     'default': {
         'ENGINE': os.getenv(
-            'DB_ENGINE', default='django.db.backends.postgresql'
+            'DB_ENGINE', default='spider.backends.postgresql_pool'
         ),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
         'PORT': os.getenv('DB_PORT', default=5432),
+        # Пул соединений воркера (spider.backends.postgresql_pool). Сумма
+        # MAX_SIZE по всем воркерам не должна превышать max_connections.
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'MAX_LIFETIME': int(
+                os.getenv('DB_POOL_MAX_LIFETIME', default=3600)
+            ),
+            'CHECK_INTERVAL': int(
+                os.getenv('DB_POOL_CHECK_INTERVAL', default=30)
+            ),
+        },
+    }
+}
+
+# Реплики для чтения: хосты через запятую (для SQLite - имена файлов).
+# Реплики не мигрируются и в тестах зеркалируют default.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(','))
+):
+    alias = f'replica_{number}'
+    field = 'NAME' if 'sqlite3' in DATABASES['default']['ENGINE'] else 'HOST'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        field: replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['spider.routers.ReplicaRouter']
+
+# Сколько секунд реплика может отставать: столько автор записи и
+# недавно измененные ресурсы читаются с default.
+DATABASE_REPLICA_LAG = int(os.getenv('DB_REPLICA_LAG', default=5))
+
+# В продакшене с несколькими воркерами нужен общий кеш (Redis, Memcached):
+# по нему воркеры узнают о сброшенных метках версий ответов.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default=""),
     }
 }
 
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", default=600))
+
+# Пользователи токенов кешируются в процессе (LRU) и в общем кеше.
+API_TOKEN_CACHE_SIZE = int(os.getenv("API_TOKEN_CACHE_SIZE", default=10000))
+API_TOKEN_CACHE_TTL = int(os.getenv("API_TOKEN_CACHE_TTL", default=300))
+API_TOKEN_CACHE_SHARED = (
+    os.getenv("API_TOKEN_CACHE_SHARED", default="True") == "True"
+)
+
+# Наибольший размер пакета POST /organizations_all/bulk/.
+API_BULK_MAX_ITEMS = int(os.getenv("API_BULK_MAX_ITEMS", default=1000))
+
+# Наибольший размер пакета POST /organizations_prices/.
+API_BULK_MAX_PRICES = int(os.getenv("API_BULK_MAX_PRICES", default=10000))
+
+# JSON предприятий собирается в PostgreSQL (api.db_json).
+API_DB_RENDERING = os.getenv("API_DB_RENDERING", default="False") == "True"
+
+# Доля запросов, для которых api.instrumentation собирает метрики SQL,
+# сериализации и рендеринга.
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv("INSTRUMENTATION_SAMPLE_RATE", default=0.01)
+)
+INSTRUMENTATION_SERVER_TIMING = (
+    os.getenv("INSTRUMENTATION_SERVER_TIMING", default="True") == "True"
+)
+# Сколько раз отпечаток SQL должен повториться, чтобы считаться дублем.
+INSTRUMENTATION_DUPLICATE_THRESHOLD = int(
+    os.getenv("INSTRUMENTATION_DUPLICATE_THRESHOLD", default=2)
+)
+
+# Метрики Prometheus по маршрутам на /metrics (api.metrics).
+PROMETHEUS_METRICS = (
+    os.getenv("PROMETHEUS_METRICS", default="True") == "True"
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.instrumentation": {
+            "handlers": ["console"],
+            "level": os.getenv("INSTRUMENTATION_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,11 +194,20 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 CSRF_TRUSTED_ORIGINS = ["http://localhost", "http://127.0.0.1"]
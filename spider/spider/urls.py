@@ -4,6 +4,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from api.metrics import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Spider API",
@@ -19,6 +21,7 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("", include("api.urls")),
     re_path(
         r"^doc(?P<format>\.json|\.yaml)$",
@@ -0,0 +1,115 @@
+from urllib.parse import quote
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    Organization,
+    Product,
+    ProductOrganization,
+)
+
+NAMES = (
+    'Кавычки " и \\ слэш',
+    "Перевод\nстроки\tи\x01управляющие",
+    "Разделители \u2028 \u2029 и emoji 🕷",
+    "</script>&<>'",
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def organizations():
+    network = NetworkOrganization.objects.create(name=NAMES[0])
+    category = Category.objects.create(name=NAMES[1])
+    districts = [District.objects.create(name=name) for name in NAMES]
+    products = [
+        Product.objects.create(name=name, category=category) for name in NAMES
+    ]
+    result = []
+    for number, name in enumerate(NAMES):
+        organization = Organization.objects.create(
+            name=name, description=NAMES[-number - 1], network=network
+        )
+        organization.district.add(*districts[: number + 1])
+        for index, product in enumerate(products[number:]):
+            ProductOrganization.objects.create(
+                organization=organization, product=product, price=index
+            )
+        result.append(organization)
+    Organization.objects.create(name="Пустое", description="", network=network)
+    return result
+
+
+@pytest.fixture
+def user_client():
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    user = User.objects.create_user(username="TestUser", password="1234567")
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def get_both(client, url):
+    with override_settings(API_DB_RENDERING=False):
+        expected = client.get(url)
+    cache.clear()
+    with override_settings(API_DB_RENDERING=True):
+        actual = client.get(url)
+    assert expected.status_code == actual.status_code
+    return expected.content, actual.content
+
+
+URLS = (
+    "/organizations_all/",
+    "/organizations_all/?page_size=2",
+    "/organizations_all/{pk}/",
+    "/organizations/{district}/",
+    "/organizations/{district}/?page_size=1&search={search}",
+    "/organizations/{district}/?search={search}&search_mode=contains",
+    "/organizations/{district}/{pk}/",
+)
+
+
+class TestDatabaseJSON:
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="JSON в базе собирается только на PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("url", URLS)
+    def test_same_bytes(self, user_client, organizations, url):
+        organization = organizations[-1]
+        url = url.format(
+            pk=organization.pk,
+            district=organization.district.first().pk,
+            search=quote("Раз"),
+        )
+        expected, actual = get_both(user_client, url)
+
+        assert (
+            expected == actual
+        ), f"Проверьте, что JSON из базы для {url} совпадает с DRF побайтно"
+
+    @pytest.mark.skipif(
+        connection.vendor == "postgresql",
+        reason="Проверяется откат на сериализатор вне PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_fallback(self, user_client, organizations):
+        expected, actual = get_both(user_client, "/organizations_all/")
+
+        assert expected == actual
@@ -0,0 +1,207 @@
+import threading
+
+import pytest
+from django.contrib.auth.models import User
+from psycopg2 import extensions
+from rest_framework.test import APIClient
+
+from spider.backends.postgresql_pool.base import reset_connection
+from spider.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.alive = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_pool(clock):
+    def make(**kwargs):
+        connections = []
+
+        def connect():
+            connection = FakeConnection(len(connections))
+            connections.append(connection)
+            return connection
+
+        pool = ConnectionPool(
+            connect,
+            check=lambda connection: connection.alive,
+            clock=clock,
+            **kwargs,
+        )
+        pool.connections = connections
+        return pool
+
+    return make
+
+
+class TestConnectionPool:
+    def test_reuse(self, make_pool):
+        pool = make_pool(max_size=2)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        assert (
+            pool.acquire() is connection
+        ), "Проверьте, что возвращенное соединение выдается повторно"
+        assert len(pool.connections) == 1
+        assert pool.stats()["in_use"] == 1
+
+    def test_min_size(self, make_pool):
+        pool = make_pool(min_size=3, max_size=5)
+        pool.fill()
+
+        assert (
+            pool.stats()["idle"] == 3
+        ), "Проверьте, что пул сразу открывает min_size соединений"
+        pool.acquire()
+        assert len(pool.connections) == 3
+
+    def test_timeout(self, make_pool):
+        pool = make_pool(max_size=1, timeout=0)
+        pool.acquire()
+
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert pool.stats()["timeouts"] == 1
+
+    def test_waiter_gets_released_connection(self, make_pool):
+        pool = make_pool(max_size=1, timeout=5)
+        connection = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire())
+        )
+        waiter.start()
+        while not pool.stats()["waiting"]:
+            pass
+        pool.release(connection)
+        waiter.join(5)
+
+        assert acquired == [
+            connection
+        ], "Проверьте, что ожидающий поток получает возвращенное соединение"
+
+    def test_liveness_check(self, make_pool, clock):
+        pool = make_pool(check_interval=10)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.alive = False
+        clock.now = 5
+
+        assert (
+            pool.acquire() is connection
+        ), "Проверьте, что недавно работавшее соединение не проверяется"
+        pool.release(connection)
+        clock.now = 20
+        fresh = pool.acquire()
+
+        assert (
+            fresh is not connection
+        ), "Проверьте, что мертвое соединение заменяется новым"
+        assert connection.closed
+        assert pool.stats()["size"] == 1
+
+    def test_max_lifetime(self, make_pool, clock):
+        pool = make_pool(max_lifetime=60)
+        connection = pool.acquire()
+        clock.now = 61
+        pool.release(connection)
+
+        assert (
+            connection.closed
+        ), "Проверьте, что соединение старше max_lifetime закрывается"
+        assert pool.acquire() is not connection
+
+    def test_connect_error_frees_slot(self, clock):
+        def connect():
+            raise OSError("нет соединения")
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0, clock=clock)
+        for _ in range(2):
+            with pytest.raises(OSError):
+                pool.acquire()
+        assert pool.stats()["size"] == 0
+
+    def test_stats(self, make_pool, clock):
+        pool = make_pool(max_size=3)
+        first = pool.acquire()
+        pool.acquire()
+        pool.release(first)
+        stats = pool.stats()
+
+        assert stats["size"] == 2
+        assert stats["in_use"] == 1
+        assert stats["idle"] == 1
+        assert stats["acquired"] == 2
+        assert stats["created"] == 2
+        assert stats["waiting"] == 0
+        assert {"acquire_ms_avg", "acquire_ms_max"} <= set(stats)
+
+
+class FakeInfo:
+    def __init__(self, transaction_status):
+        self.transaction_status = transaction_status
+
+
+class FakePgConnection(FakeConnection):
+    def __init__(self, transaction_status):
+        super().__init__(0)
+        self.info = FakeInfo(transaction_status)
+        self.rolled_back = False
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class TestResetConnection:
+    @pytest.mark.parametrize(
+        "status,reusable,rolled_back",
+        [
+            (extensions.TRANSACTION_STATUS_IDLE, True, False),
+            (extensions.TRANSACTION_STATUS_INTRANS, True, True),
+            (extensions.TRANSACTION_STATUS_INERROR, True, True),
+            (extensions.TRANSACTION_STATUS_UNKNOWN, False, False),
+        ],
+    )
+    def test_reset(self, status, reusable, rolled_back):
+        connection = FakePgConnection(status)
+
+        assert reset_connection(connection) is reusable
+        assert connection.rolled_back is rolled_back
+
+
+class TestDatabasePoolStats:
+    url = "/db_pool/"
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("is_staff,status", [(True, 200), (False, 403)])
+    def test_access(self, is_staff, status):
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_user(username="Admin", is_staff=is_staff)
+        )
+        response = client.get(self.url)
+
+        assert response.status_code == status, (
+            "Проверьте, что статистика пулов доступна только администратору"
+        )
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from api.cache import CATALOG, ORGANIZATIONS, district_scope, get_stamps
+from organizations.models import (
+    Category,
+    District,
+    Organization,
+    Product,
+    ProductOrganization,
+)
+
+CSV_DATA = """organization,description,network,districts,product,category,price
+Магазин 1,Описание,Сеть,Центр;Север,Молоко,Молочные,100
+Магазин 1,Описание,Сеть,Центр;Север,Хлеб,Выпечка,50
+Магазин 2,Описание,Сеть,Центр,Молоко,Молочные,90
+"""
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    records = [
+        {
+            "name": f"Магазин {number}",
+            "description": "Описание",
+            "network": "Сеть",
+            "districts": ["Центр"],
+            "products": [
+                {"name": "Молоко", "category": "Молочные", "price": number},
+                {"name": "Хлеб", "category": "Выпечка", "price": 10},
+            ],
+        }
+        for number in range(5)
+    ]
+    path.write_text(
+        "\n".join(json.dumps(record, ensure_ascii=False) for record in records),
+        encoding="utf-8",
+    )
+    return path
+
+
+class TestImportCatalog:
+    @pytest.mark.django_db(transaction=True)
+    def test_import_jsonl(self, jsonl_file):
+        call_command("import_catalog", jsonl_file, batch_size=2)
+
+        assert Organization.objects.count() == 5
+        assert Product.objects.count() == 2, (
+            "Проверьте, что товары сопоставляются по названию и категории"
+        )
+        assert District.objects.count() == 1
+        assert ProductOrganization.objects.count() == 10
+        assert not jsonl_file.with_name("catalog.jsonl.checkpoint").exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_csv(self, tmp_path):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV_DATA, encoding="utf-8")
+        call_command("import_catalog", path)
+
+        organization = Organization.objects.get(name="Магазин 1")
+        assert organization.district.count() == 2
+        assert organization.product.count() == 2
+        assert Category.objects.count() == 2
+        assert ProductOrganization.objects.count() == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_resume(self, jsonl_file):
+        checkpoint = jsonl_file.with_name("catalog.jsonl.checkpoint")
+        checkpoint.write_text(json.dumps({"position": 3}))
+        call_command("import_catalog", jsonl_file, resume=True)
+
+        assert sorted(
+            Organization.objects.values_list("name", flat=True)
+        ) == ["Магазин 3", "Магазин 4"], (
+            "Проверьте, что при --resume загружаются только новые записи"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_invalid_price(self, tmp_path):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV_DATA.replace(",90", ",-1"), encoding="utf-8")
+
+        with pytest.raises(CommandError):
+            call_command("import_catalog", path, batch_size=1)
+        assert Organization.objects.count() == 1, (
+            "Проверьте, что пачки до ошибки сохраняются"
+        )
+        assert json.loads(
+            path.with_name("catalog.csv.checkpoint").read_text()
+        ) == {"position": 2}
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "line",
+        [
+            "[1, 2]",
+            '"строка"',
+            '{"name": "Без сети", "description": "", "districts": [], '
+            '"products": []}',
+            '{"name": "Магазин", "description": "", "network": "Сеть", '
+            '"districts": "Центр", "products": []}',
+            '{"name": "Магазин", "description": "", "network": "Сеть", '
+            '"districts": [], "products": [{"name": "Молоко"}]}',
+            '{"name": "Магазин", "description": "", "network": "Сеть", '
+            '"districts": [], "products": ["Молоко"]}',
+        ],
+    )
+    def test_import_invalid_jsonl(self, jsonl_file, line):
+        lines = jsonl_file.read_text(encoding="utf-8").splitlines()
+        lines.insert(1, line)
+        jsonl_file.write_text("\n".join(lines), encoding="utf-8")
+
+        with pytest.raises(CommandError, match="Строка 2"):
+            call_command("import_catalog", jsonl_file, batch_size=1)
+        assert Organization.objects.count() == 1, (
+            "Проверьте, что пачки до некорректной строки сохраняются"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_invalidates_batches(self, tmp_path):
+        path = tmp_path / "catalog.csv"
+        path.write_text(CSV_DATA.replace(",90", ",-1"), encoding="utf-8")
+        district = District.objects.create(name="Центр")
+        scopes = (CATALOG, ORGANIZATIONS, district_scope(district.pk))
+        before = get_stamps(*scopes)
+
+        with pytest.raises(CommandError):
+            call_command("import_catalog", path, batch_size=1)
+        catalog, organizations, district = zip(before, get_stamps(*scopes))
+        assert catalog[0] != catalog[1], (
+            "Проверьте, что созданные справочники сбрасывают кеш"
+        )
+        assert organizations[0] != organizations[1]
+        assert district[0] != district[1], (
+            "Проверьте, что кеш сбрасывается после каждой сохраненной пачки"
+        )
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from api.filters import ProductSearchFilter
+from api.views import OrganizationViewSet
+from organizations.models import (
+    Category,
+    District,
+    NetworkOrganization,
+    Organization,
+    Product,
+    ProductOrganization,
+)
+
+# Покрывающие и функциональные индексы создаются только на PostgreSQL,
+# на котором работает проект.
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql",
+    reason="Планы запросов проверяются на PostgreSQL",
+)
+
+
+@pytest.fixture
+def organization():
+    category = Category.objects.create(name="Тестовая категория")
+    district = District.objects.create(name="Тестовый район")
+    network = NetworkOrganization.objects.create(name="Тестовая сеть")
+    organization = Organization.objects.create(
+        name="Тестовое предприятие", description="Описание", network=network
+    )
+    organization.district.add(district)
+    product = Product.objects.create(name="Молоко", category=category)
+    ProductOrganization.objects.create(
+        organization=organization, product=product, price=100
+    )
+    return organization
+
+
+def explain(queryset):
+    """План запроса, в котором планировщику запрещен полный перебор.
+
+    На маленьких тестовых таблицах PostgreSQL выбрал бы Seq Scan, поэтому
+    проверяется, что для запроса вообще есть подходящий индекс.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def assert_uses_index(queryset, index):
+    plan = explain(queryset)
+    assert (
+        index in plan
+    ), f"Проверьте, что запрос использует индекс {index}:\n{plan}"
+
+
+class TestIndexes:
+    @pytest.mark.django_db(transaction=True)
+    def test_district_filter(self, organization):
+        district = organization.district.get()
+        view = OrganizationViewSet(kwargs={"district_id": district.pk})
+
+        assert_uses_index(
+            view.get_queryset().values("pk"), "organization_district_unique"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_organization_prices(self, organization):
+        queryset = ProductOrganization.objects.filter(
+            organization__in=[organization.pk]
+        ).values("product", "price")
+
+        assert_uses_index(queryset, "product_organization_unique")
+
+    @pytest.mark.django_db(transaction=True)
+    def test_category_filter(self, organization):
+        queryset = Organization.objects.filter(
+            product__category__name="Тестовая категория"
+        ).values("pk")
+
+        assert_uses_index(queryset, "product_organization_")
+
+    @pytest.mark.django_db(transaction=True)
+    def test_product_price(self, organization):
+        queryset = ProductOrganization.objects.filter(
+            product=organization.product.get(), price__lte=500
+        ).values("organization")
+
+        assert_uses_index(queryset, "product_organization_price")
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "mode, index",
+        [
+            ("prefix", "organizations_product_name_prefix_idx"),
+            ("contains", "organizations_product_name_trgm_idx"),
+        ],
+    )
+    def test_product_search(self, organization, mode, index):
+        request = OrganizationViewSet().initialize_request(
+            APIRequestFactory().get(
+                "/", {"search": "Мол", "search_mode": mode}
+            )
+        )
+        view = OrganizationViewSet(search_fields=("^product__name",))
+        queryset = ProductSearchFilter().filter_queryset(
+            request, Organization.objects.all(), view
+        )
+
+        assert_uses_index(queryset.values("pk"), index)
@@ -0,0 +1,136 @@
+import json
+import logging
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.instrumentation import RequestMetrics, current_metrics, fingerprint
+from organizations.models import Category
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture
+def sampled(settings):
+    settings.INSTRUMENTATION_SAMPLE_RATE = 1
+    settings.INSTRUMENTATION_SERVER_TIMING = True
+
+
+@pytest.fixture
+def token():
+    user = User.objects.create_user(username="TestUser", password="1234567")
+    return Token.objects.create(user=user).key
+
+
+@pytest.fixture
+def user_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    return client
+
+
+@pytest.fixture
+def categories():
+    return [
+        Category.objects.create(name=f"Категория {number}")
+        for number in range(3)
+    ]
+
+
+def server_timing(response):
+    """Заголовок Server-Timing в виде {метрика: (dur, desc)}."""
+    metrics = {}
+    for item in response["Server-Timing"].split(", "):
+        name, *params = item.split(";")
+        values = dict(param.split("=", 1) for param in params)
+        metrics[name] = (float(values["dur"]), values.get("desc"))
+    return metrics
+
+
+def test_fingerprint():
+    assert fingerprint(
+        'SELECT "id" FROM "t" WHERE "id" IN (%s, %s, %s)  LIMIT 21'
+    ) == fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s) LIMIT 1')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_server_timing(sampled, user_client, categories, caplog):
+    user_client.get("/districts/")
+    with caplog.at_level(logging.INFO, logger="api.instrumentation"):
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get("/categories/")
+
+    assert response.status_code == 200
+    metrics = server_timing(response)
+    assert set(metrics) == {"db", "serializer", "render", "total"}, (
+        "Проверьте, что Server-Timing содержит db, serializer, render и total"
+    )
+    queries = len(context.captured_queries)
+    assert metrics["db"][1] == f'"queries={queries} duplicates=0"'
+    assert metrics["serializer"][0] > 0 and metrics["render"][0] > 0
+    assert metrics["total"][0] >= metrics["db"][0]
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["view"] == "api:categories-list"
+    assert record["queries"] == queries
+    assert record["status"] == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_not_sampled(settings, user_client, categories, caplog):
+    settings.INSTRUMENTATION_SAMPLE_RATE = 0
+    with caplog.at_level(logging.INFO, logger="api.instrumentation"):
+        response = user_client.get("/categories/")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
+    assert not caplog.records
+
+
+@pytest.mark.django_db(transaction=True)
+def test_duplicates(settings, categories):
+    settings.INSTRUMENTATION_DUPLICATE_THRESHOLD = 3
+    metrics = RequestMetrics()
+    token = current_metrics.set(metrics)
+    try:
+        for category in categories:
+            Category.objects.get(pk=category.pk)
+        Category.objects.count()
+    finally:
+        current_metrics.reset(token)
+
+    assert metrics.query_count == 4
+    (duplicate,) = metrics.duplicates()
+    assert duplicate[1] == 3, "Проверьте, что запросы N+1 находятся"
+    assert re.search(r'"organizations_category"\."id" = %s', duplicate[0])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_view(sampled, token, categories):
+    client = AsyncClient()
+
+    async def get():
+        return await client.get(
+            "/categories/", AUTHORIZATION=f"Token {token}"
+        )
+
+    response = async_to_sync(get)()
+
+    assert response.status_code == 200
+    metrics = server_timing(response)
+    assert not metrics["db"][1].startswith('"queries=0'), (
+        "Проверьте, что запросы из потоков sync_to_async учитываются"
+    )
+    assert metrics["serializer"][0] > 0
@@ -0,0 +1,187 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Нагрузочный тест лежит в корне репозитория, рядом с проектом Django.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from loadtest.client import HTTPError, read_chunked, read_response  # noqa
+from loadtest.report import compare, percentile  # noqa
+from loadtest.scenarios import DEFAULT_MIX, parse_mix  # noqa
+
+
+def feed(function, data, *args):
+    """Результат function(reader, *args) для потока с данными data."""
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await function(reader, *args)
+
+    return asyncio.run(run())
+
+
+def read(data, method="GET"):
+    return feed(read_response, data, method)
+
+
+def report(error_rate=0.0, p99=100.0, throughput=50.0):
+    summary = {
+        "requests": 1000,
+        "throughput_rps": throughput,
+        "error_rate": error_rate,
+        "p50_ms": 10.0,
+        "p95_ms": 50.0,
+        "p99_ms": p99,
+    }
+    return {"total": summary, "scenarios": {"catalog": dict(summary)}}
+
+
+class TestPercentile:
+    @pytest.mark.parametrize(
+        "fraction, expected", [(0, 0), (0.5, 50), (0.99, 99), (1, 100)]
+    )
+    def test_percentile(self, fraction, expected):
+        values = list(range(100, -1, -1))
+
+        assert percentile(values, fraction) == expected, (
+            "Проверьте, что перцентиль берется из отсортированных значений"
+        )
+
+    def test_single_value(self):
+        assert percentile([7], 0.99) == 7
+
+
+class TestCompare:
+    def test_no_regressions(self):
+        result = compare(report(), report(p99=105.0), 0.1)
+
+        assert result["regressions"] == []
+        assert result["metrics"]["total"]["p99_ms"]["change"] == 0.05
+
+    def test_latency_and_throughput(self):
+        result = compare(report(), report(p99=150.0, throughput=40.0), 0.1)
+
+        assert set(result["regressions"]) == {
+            "total.p99_ms",
+            "total.throughput_rps",
+            "catalog.p99_ms",
+            "catalog.throughput_rps",
+        }, (
+            "Проверьте, что рост задержки и падение пропускной способности - "
+            "регрессии"
+        )
+
+    def test_error_tolerance(self):
+        base = report(error_rate=0.001)
+
+        assert not compare(base, report(error_rate=0.005), 0.1)[
+            "regressions"
+        ], "Проверьте, что доля ошибок сравнивается с --error-tolerance"
+        result = compare(base, report(error_rate=0.05), 0.1)
+        assert "total.error_rate" in result["regressions"]
+        result = compare(base, report(error_rate=0.05), 0.1, 0.1)
+        assert not result["regressions"]
+        assert result["error_tolerance"] == 0.1
+
+    def test_errors_from_zero(self):
+        result = compare(report(), report(error_rate=0.02), 0.1)
+
+        assert result["metrics"]["total"]["error_rate"]["change"] is None
+        assert "total.error_rate" in result["regressions"], (
+            "Проверьте, что появление ошибок считается регрессией"
+        )
+
+    def test_missing_scenario(self):
+        new = report()
+        del new["scenarios"]["catalog"]
+
+        assert list(compare(report(), new, 0.1)["metrics"]) == ["total"]
+
+
+class TestParseMix:
+    def test_default(self):
+        assert parse_mix(None) == DEFAULT_MIX
+        assert parse_mix("") is not DEFAULT_MIX
+
+    def test_weights(self):
+        assert parse_mix("catalog=30, auth") == {"catalog": 30.0, "auth": 1.0}
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="unknown"):
+            parse_mix("catalog=1,unknown=2")
+
+
+class TestReadResponse:
+    def test_content_length(self):
+        response, keep_alive = read(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: 11\r\n\r\n{\"a\": [1]}\nrest"
+        )
+
+        assert response.status == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {"a": [1]}
+        assert keep_alive
+
+    def test_chunked(self):
+        response, keep_alive = read(
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"4\r\nspid\r\n2;ext=1\r\ner\r\n0\r\nTrailer: x\r\n\r\n"
+        )
+
+        assert response.body == b"spider"
+        assert keep_alive
+
+    def test_read_chunked(self):
+        data = b"a\r\n0123456789\r\n0\r\n\r\nnext"
+
+        assert feed(read_chunked, data) == b"0123456789"
+
+    def test_until_close(self):
+        response, keep_alive = read(b"HTTP/1.1 200 OK\r\n\r\nbody")
+
+        assert response.body == b"body"
+        assert not keep_alive, (
+            "Проверьте, что ответ без длины закрывает соединение"
+        )
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"HTTP/1.1 304 Not Modified\r\nContent-Length: 10\r\n\r\n",
+            b"HTTP/1.1 204 No Content\r\n\r\n",
+        ],
+    )
+    def test_no_body(self, data):
+        response, keep_alive = read(data)
+
+        assert response.body == b""
+        assert keep_alive
+
+    def test_head(self):
+        response, _ = read(
+            b"HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n", method="HEAD"
+        )
+
+        assert response.body == b""
+
+    @pytest.mark.parametrize(
+        "data, keep_alive",
+        [
+            (b"HTTP/1.1 200 OK\r\nConnection: close\r\n", False),
+            (b"HTTP/1.0 200 OK\r\n", False),
+            (b"HTTP/1.1 200 OK\r\n", True),
+        ],
+    )
+    def test_keep_alive(self, data, keep_alive):
+        _, result = read(data + b"Content-Length: 0\r\n\r\n")
+
+        assert result is keep_alive
+
+    def test_bad_status_line(self):
+        with pytest.raises(HTTPError):
+            read(b"garbage\r\n\r\n")
@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from api.metrics import metrics_view
+from organizations.models import District
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    settings.PROMETHEUS_METRICS = True
+    cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture
+def user_client():
+    user = User.objects.create_user(username="TestUser", password="1234567")
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+    )
+    return client
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_route_metrics(user_client):
+    district = District.objects.create(name="Тестовый район")
+    url = f"/organizations/{district.pk}/"
+    labels = {"route": "organizations-list"}
+    latency = {**labels, "method": "GET", "status": "200"}
+    before = {
+        "requests": sample("api_request_duration_seconds_count", **latency),
+        "queries": sample("api_request_queries_sum", **labels),
+        "size": sample("api_response_size_bytes_sum", **labels),
+        "hit": sample(
+            "api_cache_requests_total", cache="response", result="hit"
+        ),
+        "miss": sample(
+            "api_cache_requests_total", cache="response", result="miss"
+        ),
+        "in_flight": sample("api_requests_in_flight"),
+    }
+    with CaptureQueriesContext(connection) as context:
+        first = user_client.get(url)
+    queries = len(context.captured_queries)
+    user_client.get(url)
+
+    assert first.status_code == 200
+    assert (
+        sample("api_request_duration_seconds_count", **latency)
+        == before["requests"] + 2
+    ), "Проверьте, что задержка считается по basename маршрута"
+    assert (
+        sample("api_request_queries_sum", **labels)
+        == before["queries"] + queries
+    ), "Проверьте, что гистограмма запросов к БД получает их число"
+    assert sample("api_response_size_bytes_sum", **labels) == before[
+        "size"
+    ] + 2 * len(first.content)
+    assert (
+        sample("api_cache_requests_total", cache="response", result="miss")
+        == before["miss"] + 1
+    )
+    assert (
+        sample("api_cache_requests_total", cache="response", result="hit")
+        == before["hit"] + 1
+    ), "Проверьте, что повторный ответ из кеша считается попаданием"
+    assert sample("api_requests_in_flight") == before["in_flight"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+
+    assert (
+        response.status_code == 200
+    ), "Проверьте, что /metrics доступен без токена"
+    assert b"api_request_duration_seconds_bucket" in response.content
+
+
+def test_multiprocess(tmp_path, monkeypatch):
+    """Значения из нескольких процессов складываются в /metrics."""
+    script = (
+        "import django; django.setup(); "
+        "from api.metrics import REQUEST_LATENCY; "
+        "REQUEST_LATENCY.labels('organizations-list', 'GET', '200')"
+        ".observe(0.2)"
+    )
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "DJANGO_SETTINGS_MODULE": "spider.settings",
+    }
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, "-c", script], cwd=BASE_DIR, env=env, check=True
+        )
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    content = metrics_view(None).content.decode()
+
+    assert (
+        'api_request_duration_seconds_count{method="GET",'
+        'route="organizations-list",status="200"} 2.0'
+    ) in content, "Проверьте, что метрики воркеров складываются"
@@ -0,0 +1,1730 @@
+import asyncio
+import csv
+import importlib
+import io
+import json
+import threading
+import time
+from urllib.parse import quote
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+
+from api.authentication import token_cache
+from organizations.models import (
+    Category,
+    District,
+    DistrictOrganizationSummary,
+    NetworkOrganization,
+    Organization,
+    OrganizationDistrict,
+    Product,
+    ProductOrganization,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture
+def network():
+    return NetworkOrganization.objects.create(name="Тестовая сеть")
+
+
+@pytest.fixture
+def district():
+    return District.objects.create(name="Тестовый район")
+
+
+@pytest.fixture
+def district_2():
+    return District.objects.create(name="Тестовый район 2")
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name="Тестовая категория")
+
+
+@pytest.fixture
+def product(category):
+    return Product.objects.create(name="Тестовый товар", category=category)
+
+
+@pytest.fixture
+def product_2(category):
+    return Product.objects.create(name="Тестовый товар 2", category=category)
+
+
+@pytest.fixture
+def organization(network, district, product):
+    organization = Organization.objects.create(
+        name="Тестовое предприятие",
+        description="Описание",
+        network=network,
+    )
+    OrganizationDistrict.objects.create(
+        organization=organization, district=district
+    )
+    ProductOrganization.objects.create(
+        organization=organization, product=product, price=100
+    )
+    return organization
+
+
+@pytest.fixture
+def create_organizations(network, district, district_2, category):
+    def create(count):
+        for number in range(count):
+            organization = Organization.objects.create(
+                name=f"Предприятие {number}",
+                description="Описание",
+                network=network,
+            )
+            organization.district.add(district, district_2)
+            for index in range(3):
+                product = Product.objects.create(
+                    name=f"Товар {number}-{index}", category=category
+                )
+                ProductOrganization.objects.create(
+                    organization=organization, product=product, price=index
+                )
+
+    return create
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="TestUser", password="1234567")
+
+
+@pytest.fixture
+def client():
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    return client
+
+
+@pytest.fixture
+def token(user):
+    from rest_framework.authtoken.models import Token
+
+    token, _ = Token.objects.get_or_create(user=user)
+    return token.key
+
+
+@pytest.fixture
+def user_client(token):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    return client
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert (
+        response.status_code == 200
+    ), f"Проверьте, что при GET запросе на {url} возвращается статус 200"
+    return len(context.captured_queries)
+
+
+class TestOrganizationAPI:
+    @pytest.mark.django_db(transaction=True)
+    def test_organization_fields(self, user_client, organization, product):
+        url = f"/organizations_all/{organization.pk}/"
+        response = user_client.get(url)
+        test_data = response.json()
+
+        assert (
+            test_data["network"] == organization.network.name
+        ), f"Проверьте, что при GET запросе на {url} возвращается сеть"
+        assert (
+            test_data["count_products"] == 1
+        ), f"Проверьте, что при GET запросе на {url} возвращается count_products"
+        assert (
+            test_data["count_districts"] == 1
+        ), f"Проверьте, что при GET запросе на {url} возвращается count_districts"
+        assert test_data["product"] == [
+            {
+                "id": product.pk,
+                "name": product.name,
+                "category": product.category.name,
+                "price": 100,
+            }
+        ], f"Проверьте, что при GET запросе на {url} возвращаются товары"
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "url",
+        ["/organizations_all/", "/organizations/{district}/"],
+    )
+    def test_list_queries_constant(
+        self, user_client, create_organizations, district, url
+    ):
+        url = url.format(district=district.pk)
+        user_client.get("/categories/")
+        create_organizations(2)
+        queries_small = count_queries(user_client, url)
+        create_organizations(8)
+        queries_big = count_queries(user_client, url)
+
+        assert queries_small == queries_big, (
+            f"Проверьте, что количество запросов при GET запросе на {url} "
+            "не зависит от числа предприятий"
+        )
+        assert (
+            queries_big == 3
+        ), f"Проверьте, что при GET запросе на {url} выполняется 3 запроса"
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "url",
+        ["/organizations_all/{pk}/", "/organizations/{district}/{pk}/"],
+    )
+    def test_detail_queries_constant(
+        self, user_client, create_organizations, district, url
+    ):
+        create_organizations(5)
+        organization = Organization.objects.first()
+        url = url.format(district=district.pk, pk=organization.pk)
+        user_client.get("/categories/")
+
+        assert (
+            count_queries(user_client, url) == 3
+        ), f"Проверьте, что при GET запросе на {url} выполняется 3 запроса"
+
+
+class TestOrganizationPagination:
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/organizations_all/?page_size=3",
+            "/organizations/{district}/?page_size=3",
+            "/organizations/{district}/?page_size=3&categories={category}",
+        ],
+    )
+    def test_cursor_pages(
+        self, user_client, create_organizations, district, category, url
+    ):
+        create_organizations(7)
+        url = url.format(district=district.pk, category=quote(category.name))
+        pks = []
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                data = user_client.get(url).json()
+                assert set(data) == {"next", "previous", "results"}, (
+                    f"Проверьте, что при GET запросе на {url} "
+                    "возвращается страница с курсором"
+                )
+                assert len(data["results"]) <= 3
+                pks.extend(item["id"] for item in data["results"])
+                url = data["next"]
+
+        expected = list(
+            Organization.objects.order_by("-pk").values_list("pk", flat=True)
+        )
+        assert (
+            pks == expected
+        ), "Проверьте, что страницы выдают все предприятия без повторов"
+        for query in context.captured_queries:
+            sql = query["sql"].upper()
+            assert "OFFSET" not in sql, "Пагинация не должна использовать OFFSET"
+            assert "COUNT(*)" not in sql, "Пагинация не должна считать строки"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cursor_stable_on_insert(self, user_client, create_organizations):
+        create_organizations(4)
+        data = user_client.get("/organizations_all/?page_size=2").json()
+        first_page = [item["id"] for item in data["results"]]
+        create_organizations(3)
+        data = user_client.get(data["next"]).json()
+        second_page = [item["id"] for item in data["results"]]
+
+        assert not set(first_page) & set(second_page), (
+            "Проверьте, что новые записи не сдвигают следующую страницу"
+        )
+        assert max(second_page) < min(first_page)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "ordering", ["min_price", "-max_price", "count_products"]
+    )
+    def test_cursor_ties(
+        self, user_client, create_organizations, district, ordering
+    ):
+        create_organizations(7)
+        url = f"/organizations/{district.pk}/?ordering={ordering}&page_size=2"
+        pages = []
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                data = user_client.get(url).json()
+                pages.append([item["id"] for item in data["results"]])
+                url = data["next"]
+            previous = []
+            url = data["previous"]
+            while url:
+                data = user_client.get(url).json()
+                previous.insert(0, [item["id"] for item in data["results"]])
+                url = data["previous"]
+
+        expected = list(
+            Organization.objects.order_by("-pk").values_list("pk", flat=True)
+        )
+        assert sum(pages, []) == expected, (
+            "Проверьте, что при одинаковых значениях сортировки страницы "
+            "выдают все предприятия без повторов"
+        )
+        assert previous == pages[:-1], (
+            "Проверьте, что ссылки previous возвращают те же страницы"
+        )
+        for query in context.captured_queries:
+            assert "OFFSET" not in query["sql"].upper(), (
+                "Проверьте, что курсор по одинаковым значениям не переходит "
+                "на OFFSET"
+            )
+
+        first = user_client.get(
+            f"/organizations/{district.pk}/?ordering={ordering}&page_size=2"
+        ).json()
+        create_organizations(3)
+        second = user_client.get(first["next"]).json()
+        assert [item["id"] for item in second["results"]] == expected[2:4], (
+            "Проверьте, что новые записи с теми же значениями не сдвигают "
+            "следующую страницу"
+        )
+
+
+class TestOrganizationWrite:
+    url = "/organizations_all/"
+
+    @pytest.fixture
+    def products(self, category):
+        return [
+            Product.objects.create(name=f"Товар {index}", category=category)
+            for index in range(10)
+        ]
+
+    def payload(self, network, district, products, price=10):
+        return {
+            "name": "Новое предприятие",
+            "description": "Описание",
+            "network": network.pk,
+            "district": [district.pk],
+            "product": [
+                {"id": product.pk, "price": price} for product in products
+            ],
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_organization(self, user_client, network, district, products):
+        data = self.payload(network, district, products)
+        response = user_client.post(self.url, data=data, format="json")
+
+        assert (
+            response.status_code == 201
+        ), f"Проверьте, что при POST запросе на {self.url} возвращается статус 201"
+        test_data = response.json()
+        assert test_data["count_products"] == len(products)
+        assert ProductOrganization.objects.filter(
+            organization=test_data["id"]
+        ).count() == len(products)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_unknown_product(
+        self, user_client, network, district, products
+    ):
+        data = self.payload(network, district, products)
+        data["product"].append({"id": 100500, "price": 1})
+        response = user_client.post(self.url, data=data, format="json")
+
+        assert (
+            response.status_code == 400
+        ), "Проверьте, что при несуществующем товаре возвращается статус 400"
+        assert not Organization.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_queries_constant(
+        self, user_client, network, district, products
+    ):
+        queries = []
+        user_client.get("/categories/")
+        for count in (2, len(products)):
+            data = self.payload(network, district, products[:count])
+            with CaptureQueriesContext(connection) as context:
+                user_client.post(self.url, data=data, format="json")
+            queries.append(len(context.captured_queries))
+
+        assert (
+            queries[0] == queries[1]
+        ), "Проверьте, что число запросов не зависит от числа товаров"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update_diffs_products(
+        self, user_client, network, district, products
+    ):
+        data = self.payload(network, district, products[:5])
+        pk = user_client.post(self.url, data=data, format="json").json()["id"]
+        rows = dict(
+            ProductOrganization.objects.filter(organization=pk).values_list(
+                "product", "pk"
+            )
+        )
+        data["product"] = [
+            {"id": products[0].pk, "price": 10},
+            {"id": products[1].pk, "price": 99},
+            {"id": products[7].pk, "price": 5},
+        ]
+        response = user_client.put(f"{self.url}{pk}/", data=data, format="json")
+
+        assert (
+            response.status_code == 200
+        ), f"Проверьте, что при PUT запросе на {self.url}{pk}/ возвращается статус 200"
+        current = {
+            row.product_id: row
+            for row in ProductOrganization.objects.filter(organization=pk)
+        }
+        assert set(current) == {products[0].pk, products[1].pk, products[7].pk}
+        assert current[products[0].pk].pk == rows[products[0].pk]
+        assert current[products[1].pk].pk == rows[products[1].pk]
+        assert current[products[1].pk].price == 99
+        assert current[products[7].pk].price == 5
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("field", ["id", "price"])
+    def test_patch_incomplete_product(
+        self, user_client, organization, products, field
+    ):
+        product = {"id": products[0].pk, "price": 10}
+        del product[field]
+        response = user_client.patch(
+            f"{self.url}{organization.pk}/",
+            data={"product": [product]},
+            format="json",
+        )
+
+        assert response.status_code == 400, (
+            "Проверьте, что PATCH с товаром без id или цены возвращает "
+            "статус 400"
+        )
+        assert field in response.json()["product"][0]
+        assert organization.product.count() == 1
+
+
+class TestOrganizationBulk:
+    url = "/organizations_all/bulk/"
+
+    @pytest.fixture
+    def products(self, category):
+        return [
+            Product.objects.create(name=f"Товар {index}", category=category)
+            for index in range(5)
+        ]
+
+    def payload(self, network, district, products, name="Предприятие"):
+        return {
+            "name": name,
+            "description": "Описание",
+            "network": network.pk,
+            "district": [district.pk],
+            "product": [
+                {"id": product.pk, "price": index}
+                for index, product in enumerate(products)
+            ],
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_and_update(
+        self,
+        user_client,
+        network,
+        district,
+        district_2,
+        products,
+        organization,
+    ):
+        user_client.get(f"/organizations_all/{organization.pk}/")
+        user_client.get(f"/organizations/{district.pk}/")
+        data = [
+            self.payload(network, district, products[:2], "Первое"),
+            {
+                "id": organization.pk,
+                "district": [district_2.pk],
+                "product": [{"id": products[4].pk, "price": 7}],
+            },
+            self.payload(network, district, products, "Второе"),
+        ]
+        response = user_client.post(self.url, data=data, format="json")
+
+        assert (
+            response.status_code == 200
+        ), f"Проверьте, что при POST запросе на {self.url} возвращается 200"
+        results = response.json()["results"]
+        assert [item["status"] for item in results] == [
+            "created",
+            "updated",
+            "created",
+        ]
+        assert results[1]["id"] == organization.pk
+        first = Organization.objects.get(pk=results[0]["id"])
+        assert first.name == "Первое"
+        assert first.count_products == 2 and first.count_districts == 1
+        second = Organization.objects.get(pk=results[2]["id"])
+        assert second.count_products == 5
+        organization.refresh_from_db()
+        assert organization.name == "Тестовое предприятие", (
+            "Проверьте, что обновление меняет только переданные поля"
+        )
+        assert list(organization.district.all()) == [district_2]
+        assert list(
+            organization.product_organizations.values_list("product", "price")
+        ) == [(products[4].pk, 7)]
+        detail = user_client.get(f"/organizations_all/{organization.pk}/")
+        assert [item["id"] for item in detail.json()["product"]] == [
+            products[4].pk
+        ], "Проверьте, что пакетная запись сбрасывает кеш ответов"
+        listing = user_client.get(f"/organizations/{district.pk}/").json()
+        assert organization.pk not in [
+            item["id"] for item in listing["results"]
+        ], "Проверьте, что сбрасывается кеш района, из которого убрано"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_item_errors(
+        self, user_client, network, district, products, organization
+    ):
+        valid = self.payload(network, district, products[:1])
+        unknown = self.payload(network, district, products[:1])
+        unknown["product"].append({"id": 100500, "price": 1})
+        unknown["district"].append(100500)
+        data = [
+            valid,
+            unknown,
+            {"name": "Без сети"},
+            "не объект",
+            {"id": 100500, "name": "Нет такого"},
+            {"id": organization.pk, "name": "Раз"},
+            {"id": organization.pk, "name": "Два"},
+        ]
+        response = user_client.post(self.url, data=data, format="json")
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [item["status"] for item in results] == [
+            "created",
+            "error",
+            "error",
+            "error",
+            "error",
+            "updated",
+            "error",
+        ]
+        assert set(results[1]["errors"]) == {"product", "district"}
+        assert "network" in results[2]["errors"]
+        assert "id" in results[4]["errors"] and "id" in results[6]["errors"]
+        assert Organization.objects.count() == 2, (
+            "Проверьте, что ошибочные элементы не записываются"
+        )
+        organization.refresh_from_db()
+        assert organization.name == "Раз"
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("field", ["id", "price"])
+    def test_incomplete_product(
+        self, user_client, network, district, products, organization, field
+    ):
+        product = {"id": products[0].pk, "price": 3}
+        del product[field]
+        data = [
+            {"id": organization.pk, "product": [product]},
+            self.payload(network, district, products[:1]),
+        ]
+        response = user_client.post(self.url, data=data, format="json")
+
+        assert response.status_code == 200, (
+            "Проверьте, что товар без id или цены - ошибка элемента, а не "
+            "всего пакета"
+        )
+        results = response.json()["results"]
+        assert [item["status"] for item in results] == ["error", "created"]
+        assert field in results[0]["errors"]["product"][0]
+        assert organization.product.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_queries_constant(self, user_client, network, district, products):
+        user_client.get("/categories/")
+        queries = []
+        for count in (1, 10):
+            data = [
+                self.payload(network, district, products, f"Предприятие {n}")
+                for n in range(count)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                response = user_client.post(self.url, data=data, format="json")
+            assert response.status_code == 200
+            queries.append(len(context.captured_queries))
+        pks = list(Organization.objects.values_list("pk", flat=True))
+        data = [
+            {"id": pk, "product": [{"id": products[0].pk, "price": 5}]}
+            for pk in pks
+        ]
+        with CaptureQueriesContext(connection) as context:
+            user_client.post(self.url, data=data, format="json")
+
+        assert (
+            queries[0] == queries[1]
+        ), "Проверьте, что число запросов не зависит от размера пакета"
+        assert len(context.captured_queries) <= queries[0], (
+            "Проверьте, что удаление товаров не пишет по строке за запрос"
+        )
+        assert set(
+            Organization.objects.values_list("count_products", flat=True)
+        ) == {1}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_payload(self, user_client, network, district, products):
+        response = user_client.post(
+            self.url, data={"name": "Не список"}, format="json"
+        )
+        assert response.status_code == 400
+        data = [self.payload(network, district, products)] * 3
+        with override_settings(API_BULK_MAX_ITEMS=2):
+            response = user_client.post(self.url, data=data, format="json")
+        assert (
+            response.status_code == 400
+        ), "Проверьте, что слишком большой пакет возвращает статус 400"
+        assert not Organization.objects.exists()
+
+
+class TestProductPriceUpdate:
+    url = "/organizations_prices/"
+
+    @pytest.fixture
+    def rows(self, create_organizations):
+        create_organizations(3)
+        return list(ProductOrganization.objects.order_by("pk"))
+
+    def post(self, client, data, status=200):
+        response = client.post(self.url, data=data, format="json")
+        assert response.status_code == status, (
+            f"Проверьте, что при POST запросе на {self.url} "
+            f"возвращается {status}"
+        )
+        return response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update_prices(self, user_client, product, rows):
+        organization = rows[0].organization_id
+        user_client.get(f"/organizations_all/{organization}/")
+        data = [
+            {
+                "organization": row.organization_id,
+                "product": row.product_id,
+                "price": row.price + 100,
+            }
+            for row in rows[:4]
+        ]
+        data.append(
+            {
+                "organization": rows[5].organization_id,
+                "product": rows[5].product_id,
+                "price": rows[5].price,
+            }
+        )
+        data.append(
+            {"organization": organization, "product": product.pk, "price": 1}
+        )
+        result = self.post(user_client, data)
+
+        assert result == {
+            "changed": 4,
+            "unchanged": 1,
+            "missing": [{"organization": organization, "product": product.pk}],
+        }
+        prices = dict(ProductOrganization.objects.values_list("pk", "price"))
+        for row in rows:
+            expected = row.price + 100 if row in rows[:4] else row.price
+            assert prices[row.pk] == expected
+        assert not ProductOrganization.objects.filter(product=product).exists()
+        detail = user_client.get(f"/organizations_all/{organization}/").json()
+        assert sorted(item["price"] for item in detail["product"]) == [
+            100,
+            101,
+            102,
+        ], "Проверьте, что изменение цен сбрасывает кеш предприятия"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_prices(self, user_client, rows):
+        row = rows[0]
+        data = [
+            {"organization": row.organization_id, "product": row.product_id},
+            {
+                "organization": row.organization_id,
+                "product": row.product_id,
+                "price": -1,
+            },
+        ]
+        errors = self.post(user_client, data, status=400)
+
+        assert "price" in errors[0] and "price" in errors[1]
+        row.refresh_from_db()
+        assert row.price == 0, "Проверьте, что ошибочный пакет не пишется"
+        self.post(user_client, {"price": 1}, status=400)
+        with override_settings(API_BULK_MAX_PRICES=1):
+            self.post(user_client, data[:1] * 2, status=400)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_queries_constant(self, user_client, rows):
+        user_client.get("/categories/")
+        queries = []
+        for count in (2, len(rows)):
+            data = [
+                {
+                    "organization": row.organization_id,
+                    "product": row.product_id,
+                    "price": row.price + count,
+                }
+                for row in rows[:count]
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self.post(user_client, data)
+            queries.append(len(context.captured_queries))
+
+        assert (
+            queries[0] == queries[1]
+        ), "Проверьте, что число запросов не зависит от размера пакета"
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="UPDATE ... FROM (VALUES ...) только для PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_single_update_statement(self, user_client, rows):
+        data = [
+            {
+                "organization": row.organization_id,
+                "product": row.product_id,
+                "price": 50,
+            }
+            for row in rows
+        ]
+        with CaptureQueriesContext(connection) as context:
+            self.post(user_client, data)
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if "organizations_productorganization" in query["sql"]
+        ]
+
+        assert len(updates) == 1 and "FROM data" in updates[0]
+
+
+class TestOrganizationSearch:
+    def search(self, client, district, query):
+        url = f"/organizations/{district.pk}/?{query}"
+        response = client.get(url)
+        assert (
+            response.status_code == 200
+        ), f"Проверьте, что при GET запросе на {url} возвращается статус 200"
+        return [item["id"] for item in response.json()["results"]]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_without_duplicates(
+        self, user_client, create_organizations, district
+    ):
+        create_organizations(3)
+        pks = self.search(user_client, district, f"search={quote('Товар')}")
+
+        assert len(pks) == len(set(pks)) == 3, (
+            "Проверьте, что предприятие с несколькими найденными товарами "
+            "возвращается один раз"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_modes(self, user_client, create_organizations, district):
+        create_organizations(3)
+        organization = Organization.objects.order_by("pk").first()
+        term = quote("0-1")
+
+        assert not self.search(user_client, district, f"search={term}"), (
+            "Проверьте, что по умолчанию ищется начало названия товара"
+        )
+        assert self.search(
+            user_client, district, f"search={term}&search_mode=contains"
+        ) == [organization.pk], (
+            "Проверьте, что в режиме contains ищется вхождение в название"
+        )
+
+
+class TestOrganizationCategoryFilter:
+    def get_pks(self, client, district, categories, status=200):
+        query = "&".join(
+            f"categories={quote(str(item))}" for item in categories
+        )
+        url = f"/organizations/{district.pk}/?{query}"
+        response = client.get(url)
+        assert (
+            response.status_code == status
+        ), f"Проверьте, что при GET запросе на {url} возвращается {status}"
+        if status == 200:
+            return [item["id"] for item in response.json()["results"]]
+        return response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_names_and_ids(
+        self, user_client, district, category, organization, product_2
+    ):
+        ProductOrganization.objects.create(
+            organization=organization, product=product_2, price=200
+        )
+        other = Category.objects.create(name="Другая категория")
+
+        assert self.get_pks(user_client, district, [category.name]) == [
+            organization.pk
+        ], "Проверьте, что предприятие не повторяется на каждый товар"
+        assert self.get_pks(user_client, district, [category.pk]) == [
+            organization.pk
+        ], "Проверьте, что категорию можно передать по id"
+        assert self.get_pks(
+            user_client, district, [other.pk, category.name]
+        ) == [organization.pk]
+        assert self.get_pks(user_client, district, [other.name]) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unknown_category(self, user_client, district, category):
+        for value in ("Нет такой", 10**6):
+            data = self.get_pks(user_client, district, [value], status=400)
+            assert "categories" in data
+
+    @pytest.mark.django_db(transaction=True)
+    def test_names_cached(self, user_client, district, category, organization):
+        self.get_pks(user_client, district, [category.name])
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(
+                f"/organizations/{district.pk}/"
+                f"?categories={quote(category.name)}&page_size=5"
+            )
+        assert response.status_code == 200
+        for query in context.captured_queries:
+            assert 'FROM "organizations_category"' not in query["sql"], (
+                "Проверьте, что названия категорий берутся из кеша"
+            )
+
+        category.name = "Новое название"
+        category.save()
+
+        self.get_pks(user_client, district, ["Тестовая категория"], 400)
+        assert self.get_pks(user_client, district, [category.name]) == [
+            organization.pk
+        ], "Проверьте, что изменение категории сбрасывает кеш названий"
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="Категории строки района проверяются через jsonb @> "
+        "только на PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_summary_categories(
+        self, user_client, district, category, organization
+    ):
+        other = Category.objects.create(name="Другая категория")
+        url = (
+            f"/organizations/{district.pk}/"
+            f"?categories={other.pk}&categories={category.pk}"
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url)
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()["results"]] == [
+            organization.pk
+        ]
+        (sql,) = [
+            item["sql"]
+            for item in context.captured_queries
+            if item["sql"].startswith('SELECT "organizations_organization"')
+        ]
+        assert "@>" in sql
+        assert "organizations_productorganization" not in sql, (
+            "Проверьте, что фильтр категорий читает строку района"
+        )
+        assert self.get_pks(user_client, district, [other.pk]) == []
+
+
+class TestOrganizationPriceFilter:
+    @pytest.fixture
+    def priced(self, network, district, product, product_2):
+        """Предприятия с ценами (product, product_2) по порядку создания."""
+        prices = [(100, 900), (700, 50), (None, 300), (400, None)]
+        organizations = []
+        for number, pair in enumerate(prices):
+            organization = Organization.objects.create(
+                name=f"Предприятие {number}",
+                description="Описание",
+                network=network,
+            )
+            organization.district.add(district)
+            for item, price in zip((product, product_2), pair):
+                if price is not None:
+                    ProductOrganization.objects.create(
+                        organization=organization, product=item, price=price
+                    )
+            organizations.append(organization.pk)
+        Organization.objects.refresh_counters()
+        return organizations
+
+    def get_pks(self, client, district, query):
+        url = f"/organizations/{district.pk}/?{query}"
+        pks = []
+        while url:
+            response = client.get(url)
+            assert (
+                response.status_code == 200
+            ), f"Проверьте, что при GET запросе на {url} возвращается 200"
+            pks.extend(item["id"] for item in response.json()["results"])
+            url = response.json()["next"]
+        return pks
+
+    @pytest.mark.django_db(transaction=True)
+    def test_price_filters(self, user_client, district, product, priced):
+        assert self.get_pks(
+            user_client, district, f"product={product.pk}&max_price=500"
+        ) == [priced[3], priced[0]], (
+            "Проверьте, что product и max_price проверяются на одной цене"
+        )
+        assert self.get_pks(user_client, district, "min_price=800") == [
+            priced[0]
+        ]
+        assert (
+            self.get_pks(user_client, district, "min_price=10&max_price=60")
+            == [priced[1]]
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_ordering(self, user_client, district, product, priced):
+        assert self.get_pks(
+            user_client, district, "ordering=min_price&page_size=1"
+        ) == [priced[1], priced[0], priced[2], priced[3]], (
+            "Проверьте, что ordering=min_price сортирует по самой низкой цене "
+            "и курсор проходит все страницы"
+        )
+        assert self.get_pks(
+            user_client,
+            district,
+            f"ordering=-max_price&product={product.pk}&page_size=2",
+        ) == [priced[1], priced[3], priced[0]], (
+            "Проверьте, что цена для сортировки берется из подходящих строк"
+        )
+        assert self.get_pks(
+            user_client, district, "ordering=-count_products,min_price"
+        ) == [priced[1], priced[0], priced[2], priced[3]]
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "max_price=дорого",
+            "max_price=10.5",
+            "ordering=min_price&max_price=10.5",
+            "ordering=min_price&product=1.5",
+            "ordering=-max_price&min_price=дешево",
+        ],
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_price(self, user_client, district, query):
+        response = user_client.get(f"/organizations/{district.pk}/?{query}")
+
+        assert response.status_code == 400, (
+            "Проверьте, что дробная или нечисловая цена и id товара "
+            "возвращают статус 400, в том числе вместе с ordering"
+        )
+
+
+class TestOrganizationCache:
+    def test_stamps_do_not_expire(self, monkeypatch):
+        from api.cache import bump, get_versions
+
+        created = get_versions("test:created")
+        bump("test:bumped")
+        bumped = get_versions("test:bumped")
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 86400)
+
+        assert get_versions("test:created") == created, (
+            "Проверьте, что метки версий хранятся без срока жизни"
+        )
+        assert get_versions("test:bumped") == bumped
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/organizations_all/",
+            "/organizations/{district}/?categories={category}",
+            "/organizations_all/{pk}/",
+        ],
+    )
+    def test_cached_response(
+        self, user_client, organization, district, category, url
+    ):
+        url = url.format(
+            district=district.pk,
+            category=quote(category.name),
+            pk=organization.pk,
+        )
+        first = user_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            second = user_client.get(url)
+
+        assert second.status_code == 200
+        assert (
+            first.content == second.content
+        ), f"Проверьте, что повторный GET запрос на {url} отдает тот же ответ"
+        assert not context.captured_queries, (
+            f"Проверьте, что повторный GET запрос на {url} берется из кеша"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_price_change_invalidates(
+        self, user_client, organization, district
+    ):
+        url = f"/organizations/{district.pk}/"
+        user_client.get(url)
+        row = ProductOrganization.objects.get(organization=organization)
+        row.price = 555
+        row.save()
+        data = user_client.get(url).json()
+
+        assert (
+            data["results"][0]["product"][0]["price"] == 555
+        ), "Проверьте, что изменение цены сбрасывает кеш"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_district_change_invalidates(
+        self, user_client, organization, district, district_2
+    ):
+        url = f"/organizations/{district.pk}/"
+        url_2 = f"/organizations/{district_2.pk}/"
+        user_client.get(url)
+        user_client.get(url_2)
+        organization.district.set([district_2])
+
+        assert (
+            user_client.get(url).json()["results"] == []
+        ), "Проверьте, что удаление района сбрасывает кеш района"
+        assert [
+            item["id"] for item in user_client.get(url_2).json()["results"]
+        ] == [organization.pk], (
+            "Проверьте, что добавление района сбрасывает кеш района"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_catalog_change_invalidates(
+        self, user_client, organization, product
+    ):
+        url = "/organizations_all/"
+        user_client.get(url)
+        product.name = "Новое название"
+        product.save()
+        data = user_client.get(url).json()
+
+        assert (
+            data["results"][0]["product"][0]["name"] == "Новое название"
+        ), "Проверьте, что изменение товара сбрасывает кеш"
+
+
+class TestOrganizationExport:
+    url = "/organizations_export/"
+
+    def read(self, response):
+        assert response.streaming, "Проверьте, что выгрузка отдается потоком"
+        return b"".join(response.streaming_content).decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_jsonl(self, user_client, create_organizations):
+        create_organizations(3)
+        response = user_client.get(self.url)
+
+        assert (
+            response.status_code == 200
+        ), f"Проверьте, что при GET запросе на {self.url} возвращается статус 200"
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        expected = user_client.get("/organizations_all/").json()["results"]
+        assert lines == expected[::-1], (
+            "Проверьте, что выгрузка совпадает с ответом /organizations_all/"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_csv(self, user_client, create_organizations):
+        create_organizations(2)
+        response = user_client.get(f"{self.url}?type=csv")
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+
+        assert len(rows) == ProductOrganization.objects.count()
+        assert rows[0]["districts"].count(";") == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_async(self, user_client, token, create_organizations):
+        create_organizations(3)
+        client = AsyncClient()
+
+        async def export():
+            response = await client.get(
+                self.url, AUTHORIZATION=f"Token {token}"
+            )
+            content = b"".join([part async for part in response])
+            return response, content
+
+        response, content = async_to_sync(export)()
+
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in content.decode().splitlines()]
+        expected = user_client.get("/organizations_all/").json()["results"]
+        assert lines == expected[::-1], (
+            "Проверьте, что под ASGI выгрузка читает БД вне цикла событий"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_asgi_handler(self, token, create_organizations):
+        from spider.asgi import application
+
+        create_organizations(2)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "path": self.url,
+            "query_string": b"type=csv",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Token {token}".encode()),
+            ],
+        }
+
+        async def export():
+            communicator = ApplicationCommunicator(application, scope)
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(5)
+            body = b""
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    return start, body
+
+        start, body = async_to_sync(export)()
+
+        assert start["status"] == 200
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        assert len(rows) == ProductOrganization.objects.count(), (
+            "Проверьте, что ASGIHandler отправляет всю выгрузку"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_unknown_type(self, user_client):
+        response = user_client.get(f"{self.url}?type=xml")
+
+        assert response.status_code == 400
+
+
+class TestOrganizationCounters:
+    def counters(self, organization):
+        organization.refresh_from_db()
+        return organization.count_products, organization.count_districts
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_on_relations(
+        self, organization, district_2, product, product_2
+    ):
+        assert self.counters(organization) == (1, 1)
+        ProductOrganization.objects.create(
+            organization=organization, product=product_2, price=1
+        )
+        organization.district.add(district_2)
+        assert self.counters(organization) == (2, 2)
+
+        organization.district.set([district_2])
+        ProductOrganization.objects.filter(product=product).delete()
+        assert self.counters(organization) == (1, 1)
+
+        district_2.organization_set.clear()
+        assert self.counters(organization) == (1, 0)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_on_cascade(self, organization, district, product):
+        product.delete()
+        district.delete()
+
+        assert self.counters(organization) == (0, 0), (
+            "Проверьте, что каскадное удаление товара и района "
+            "пересчитывает счетчики"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_once_per_transaction(self, create_organizations):
+        create_organizations(4)
+        organizations = list(Organization.objects.order_by("pk"))
+        queries = []
+        for chunk in (organizations[:1], organizations[1:]):
+            with CaptureQueriesContext(connection) as context:
+                with transaction.atomic():
+                    ProductOrganization.objects.filter(
+                        organization__in=chunk
+                    ).delete()
+            queries.append(len(context.captured_queries))
+
+        assert queries[0] == queries[1], (
+            "Проверьте, что счетчики пересчитываются один раз на "
+            "транзакцию, а не на каждую удаленную строку"
+        )
+        for organization in organizations:
+            assert self.counters(organization) == (0, 2)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_save_keeps_counters(self, organization, product_2):
+        stale = Organization.objects.get(pk=organization.pk)
+        ProductOrganization.objects.create(
+            organization=organization, product=product_2, price=1
+        )
+        stale.name = "Новое название"
+        stale.save()
+
+        assert self.counters(organization) == (2, 1), (
+            "Проверьте, что сохранение предприятия не затирает счетчики"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_counters(self, organization):
+        Organization.objects.update(count_products=10)
+        assert Organization.objects.with_drifted_counters().exists()
+
+        call_command("reconcile_counters")
+        assert self.counters(organization) == (10, 1)
+        call_command("reconcile_counters", fix=True)
+        assert self.counters(organization) == (1, 1)
+
+
+class TestDistrictSummary:
+    def summaries(self):
+        return {
+            (row.district_id, row.organization_id): (
+                row.count_products,
+                row.min_price,
+                row.max_price,
+                row.categories,
+            )
+            for row in DistrictOrganizationSummary.objects.all()
+        }
+
+    def assert_rebuilt(self):
+        """Строки совпадают с пересобранными командой с нуля."""
+        maintained = self.summaries()
+        call_command("rebuild_district_summaries")
+        assert maintained == self.summaries(), (
+            "Проверьте, что строки районов обновляются при записи"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_migration_batches(self, create_organizations, monkeypatch):
+        from django.apps import apps
+
+        migration = importlib.import_module(
+            "organizations.migrations.0008_district_organization_summary"
+        )
+        create_organizations(5)
+        expected = self.summaries()
+        DistrictOrganizationSummary.objects.all().delete()
+        monkeypatch.setattr(migration, "BATCH_SIZE", 2)
+        migration.fill_summaries(apps, None)
+
+        assert self.summaries() == expected, (
+            "Проверьте, что миграция заполняет строки районов пачками"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_summary_on_writes(
+        self, organization, district, district_2, category, product_2
+    ):
+        key = (district.pk, organization.pk)
+        assert self.summaries() == {key: (1, 100, 100, [category.pk])}
+
+        other = Category.objects.create(name="Другая категория")
+        row = ProductOrganization.objects.create(
+            organization=organization,
+            product=Product.objects.create(name="Товар", category=other),
+            price=50,
+        )
+        organization.district.add(district_2)
+        assert self.summaries() == {
+            key: (2, 50, 100, [category.pk, other.pk]),
+            (district_2.pk, organization.pk): (
+                2,
+                50,
+                100,
+                [category.pk, other.pk],
+            ),
+        }
+
+        row.price = 500
+        row.save()
+        product_2.category = other
+        product_2.save()
+        row.product.category = category
+        row.product.save()
+        assert self.summaries()[key] == (2, 100, 500, [category.pk])
+
+        organization.district.remove(district_2)
+        ProductOrganization.objects.filter(price=100).delete()
+        assert self.summaries() == {key: (1, 500, 500, [category.pk])}
+        self.assert_rebuilt()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_summary_on_bulk_writes(
+        self, user_client, network, district, district_2, create_organizations
+    ):
+        create_organizations(3)
+        rows = list(ProductOrganization.objects.order_by("pk"))
+        response = user_client.post(
+            "/organizations_prices/",
+            data=[
+                {
+                    "organization": row.organization_id,
+                    "product": row.product_id,
+                    "price": 1000 + row.pk,
+                }
+                for row in rows[:4]
+            ],
+            format="json",
+        )
+        assert response.status_code == 200
+        self.assert_rebuilt()
+
+        organization = rows[0].organization_id
+        response = user_client.post(
+            "/organizations_all/bulk/",
+            data=[
+                {
+                    "id": organization,
+                    "district": [district_2.pk],
+                    "product": [{"id": rows[0].product_id, "price": 7}],
+                },
+                {
+                    "name": "Новое",
+                    "description": "Описание",
+                    "network": network.pk,
+                    "district": [district.pk],
+                    "product": [{"id": rows[1].product_id, "price": 3}],
+                },
+            ],
+            format="json",
+        )
+        assert response.status_code == 200
+        assert self.summaries()[(district_2.pk, organization)][:3] == (
+            1,
+            7,
+            7,
+        )
+        assert (district.pk, organization) not in self.summaries()
+        self.assert_rebuilt()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_upserts(self, organization, district, district_2):
+        organization.district.add(district_2)
+        pks = dict(
+            DistrictOrganizationSummary.objects.values_list("district", "pk")
+        )
+        organization.district.remove(district)
+        Organization.objects.filter(pk=organization.pk).refresh_summaries()
+
+        assert dict(
+            DistrictOrganizationSummary.objects.values_list("district", "pk")
+        ) == {district_2.pk: pks[district_2.pk]}, (
+            "Проверьте, что строки обновляются на месте, а удаляются только "
+            "строки исчезнувших связей"
+        )
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="Блокировки строк проверяются на PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_refresh(self, organization):
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def refresh():
+            try:
+                with transaction.atomic():
+                    barrier.wait()
+                    Organization.objects.filter(
+                        pk=organization.pk
+                    ).refresh_summaries()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=refresh) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, "Проверьте, что пересборки идут по очереди"
+        assert DistrictOrganizationSummary.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reconcile_summaries(self, organization, district, district_2):
+        organization.district.add(district_2)
+        DistrictOrganizationSummary.objects.filter(district=district).update(
+            min_price=999
+        )
+        DistrictOrganizationSummary.objects.filter(
+            district=district_2
+        ).delete()
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+
+        assert "Расхождения строк районов у 1" in out.getvalue()
+        call_command("reconcile_counters", fix=True, stdout=io.StringIO())
+        assert not Organization.objects.drifted_summaries()
+        assert self.summaries()[(district.pk, organization.pk)][1] == 100
+
+    @pytest.mark.parametrize("query", ["ordering=min_price", "min_price=10"])
+    @pytest.mark.django_db(transaction=True)
+    def test_list_reads_summary(
+        self, user_client, district, organization, query
+    ):
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(
+                f"/organizations/{district.pk}/?{query}"
+            )
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()["results"]] == [
+            organization.pk
+        ]
+        (sql,) = [
+            item["sql"]
+            for item in context.captured_queries
+            if item["sql"].startswith('SELECT "organizations_organization"')
+        ]
+        assert "district_summary" in sql
+        assert "organizations_productorganization" not in sql, (
+            "Проверьте, что фильтр и сортировка по цене читают строку района"
+        )
+
+
+class TestConditionalRequests:
+    urls = [
+        "/districts/",
+        "/districts/{district}/",
+        "/categories/",
+        "/networks/",
+        "/products/",
+        "/organizations/{district}/",
+        "/organizations/{district}/{pk}/",
+        "/organizations_all/",
+        "/organizations_all/{pk}/",
+    ]
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("url", urls)
+    def test_not_modified(self, user_client, organization, district, url):
+        url = url.format(district=district.pk, pk=organization.pk)
+        first = user_client.get(url)
+        etag = first["ETag"]
+        with CaptureQueriesContext(connection) as context:
+            second = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert second.status_code == 304, (
+            f"Проверьте, что GET запрос на {url} с актуальным If-None-Match "
+            "возвращает статус 304"
+        )
+        assert second["ETag"] == etag
+        assert not context.captured_queries, (
+            f"Проверьте, что ответ 304 на {url} не обращается к БД"
+        )
+        third = user_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+        assert third.status_code == 304, (
+            f"Проверьте, что GET запрос на {url} с актуальным "
+            "If-Modified-Since возвращает статус 304"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_changes_etag(self, user_client, organization, district):
+        etags = {
+            url: user_client.get(url)["ETag"]
+            for url in ("/categories/", "/districts/", "/organizations_all/")
+        }
+        Category.objects.create(name="Новая категория")
+
+        assert (
+            user_client.get(
+                "/categories/", HTTP_IF_NONE_MATCH=etags["/categories/"]
+            ).status_code
+            == 200
+        ), "Проверьте, что запись в модель меняет ETag ее списка"
+        assert (
+            user_client.get(
+                "/districts/", HTTP_IF_NONE_MATCH=etags["/districts/"]
+            ).status_code
+            == 304
+        ), "Проверьте, что запись в другую модель не меняет ETag списка"
+        assert (
+            user_client.get(
+                "/organizations_all/",
+                HTTP_IF_NONE_MATCH=etags["/organizations_all/"],
+            ).status_code
+            == 200
+        ), "Проверьте, что изменение справочника меняет ETag предприятий"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_if_match(self, user_client, organization):
+        url = f"/organizations_all/{organization.pk}/"
+        etag = user_client.get(url)["ETag"]
+        response = user_client.patch(
+            url, {"name": "Новое имя"}, format="json", HTTP_IF_MATCH=etag
+        )
+
+        assert (
+            response.status_code == 200
+        ), "Проверьте, что PATCH запрос с актуальным If-Match выполняется"
+        assert response["ETag"] != etag
+        assert (
+            response["ETag"] == user_client.get(url)["ETag"]
+        ), "Проверьте, что PATCH запрос возвращает ETag новой версии"
+
+        response = user_client.put(
+            url,
+            {"name": "Имя", "description": "Описание"},
+            format="json",
+            HTTP_IF_MATCH=etag,
+        )
+        assert response.status_code == 412, (
+            "Проверьте, что PUT запрос с устаревшим If-Match возвращает "
+            "статус 412"
+        )
+        organization.refresh_from_db()
+        assert organization.name == "Новое имя"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_keeps_other_districts(
+        self, user_client, organization, network, district, district_2
+    ):
+        other = Organization.objects.create(
+            name="Другое", description="Описание", network=network
+        )
+        other.district.add(district_2)
+        url = f"/organizations/{district.pk}/"
+        etag = user_client.get(url)["ETag"]
+        response = user_client.patch(
+            f"/organizations_all/{other.pk}/",
+            {"name": "Новое имя"},
+            format="json",
+        )
+
+        assert response.status_code == 200
+        assert (
+            user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        ), "Проверьте, что запись предприятия не меняет ETag других районов"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_if_match_locked(self, user_client, organization, monkeypatch):
+        from api.conditional import ConditionalRequestMixin
+
+        checks = []
+        get_validators = ConditionalRequestMixin.get_validators
+
+        def record(view, refresh=False):
+            checks.append(transaction.get_connection().in_atomic_block)
+            return get_validators(view, refresh)
+
+        monkeypatch.setattr(ConditionalRequestMixin, "get_validators", record)
+        url = f"/organizations_all/{organization.pk}/"
+        etag = user_client.get(url)["ETag"]
+        checks.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.patch(
+                url, {"name": "Новое имя"}, format="json", HTTP_IF_MATCH=etag
+            )
+
+        assert response.status_code == 200
+        assert checks[0], (
+            "Проверьте, что If-Match сверяется внутри транзакции записи"
+        )
+        if connection.features.has_select_for_update:
+            assert any(
+                "FOR UPDATE" in query["sql"]
+                for query in context.captured_queries
+            ), "Проверьте, что строка блокируется до проверки If-Match"
+
+    @pytest.mark.skipif(
+        connection.vendor != "postgresql",
+        reason="Блокировки строк проверяются на PostgreSQL",
+    )
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_if_match(self, user_client, token, organization):
+        from rest_framework.test import APIClient
+
+        url = f"/organizations_all/{organization.pk}/"
+        etag = user_client.get(url)["ETag"]
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def put(name):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+            try:
+                barrier.wait()
+                response = client.put(
+                    url,
+                    {"name": name, "description": "Описание"},
+                    format="json",
+                    HTTP_IF_MATCH=etag,
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=put, args=(name,))
+            for name in ("Первое", "Второе")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == [200, 412], (
+            "Проверьте, что из двух PUT с одним If-Match выполняется только "
+            "первый"
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_over_modified_since(self, user_client, organization):
+        url = f"/organizations_all/{organization.pk}/"
+        first = user_client.get(url)
+        response = user_client.get(
+            url,
+            HTTP_IF_NONE_MATCH='"stale"',
+            HTTP_IF_MODIFIED_SINCE=first["Last-Modified"],
+        )
+
+        assert response.status_code == 200, (
+            "Проверьте, что при If-None-Match заголовок If-Modified-Since "
+            "не проверяется"
+        )
+
+
+class TestCachedTokenAuthentication:
+    url = "/categories/"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_token_cached(self, user_client):
+        user_client.get(self.url)
+        token_cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(self.url)
+
+        assert response.status_code == 200
+        assert not [
+            query
+            for query in context.captured_queries
+            if "authtoken_token" in query["sql"]
+        ], "Проверьте, что пользователь токена берется из кеша"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_token_deleted(self, user_client, user):
+        user_client.get(self.url)
+        user.auth_token.delete()
+
+        assert (
+            user_client.get(self.url).status_code == 401
+        ), "Проверьте, что удаленный токен сразу перестает работать"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_deactivated(self, user_client, user):
+        user_client.get(self.url)
+        user.is_active = False
+        user.save()
+
+        assert (
+            user_client.get(self.url).status_code == 401
+        ), "Проверьте, что токен неактивного пользователя сразу не работает"
+
+
+def async_request(method, url, token, **kwargs):
+    """Запрос через AsyncClient, который передает kwargs заголовками ASGI."""
+
+    async def request():
+        client = AsyncClient()
+        return await getattr(client, method)(
+            url, AUTHORIZATION=f"Token {token}", **kwargs
+        )
+
+    return async_to_sync(request)()
+
+
+class TestAsyncViews:
+    urls = [
+        "/categories/",
+        "/products/",
+        "/organizations/{district}/?categories={category}",
+        "/organizations/{district}/{pk}/",
+        "/organizations_all/",
+        "/organizations_all/{pk}/",
+        "/organizations_all/0/",
+    ]
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("url", urls)
+    def test_same_response(
+        self, user_client, token, organization, district, category, url
+    ):
+        url = url.format(
+            district=district.pk,
+            category=quote(category.name),
+            pk=organization.pk,
+        )
+        expected = user_client.get(url)
+        cache.clear()
+        response = async_request("get", url, token)
+
+        assert asyncio.iscoroutinefunction(
+            resolve(url.split("?")[0]).func
+        ), f"Проверьте, что {url} обслуживает асинхронное представление"
+        assert response.status_code == expected.status_code
+        assert (
+            response.content == expected.content
+        ), f"Проверьте, что асинхронный запрос на {url} отдает тот же ответ"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_stays_sync(self, token, organization):
+        response = async_request(
+            "patch",
+            f"/organizations_all/{organization.pk}/",
+            token,
+            data={"name": "Новое имя"},
+            content_type="application/json",
+        )
+
+        assert response.status_code == 200
+        organization.refresh_from_db()
+        assert organization.name == "Новое имя"
@@ -0,0 +1,91 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+UTC = datetime.timezone.utc
+
+DATA = OrderedDict(
+    [
+        ("id", 1),
+        ("name", "Предприятие \"1\" \u2028\u2029 🕷"),
+        ("price", decimal.Decimal("10.50")),
+        (
+            "created",
+            datetime.datetime(2022, 10, 6, 18, 9, tzinfo=UTC),
+        ),
+        ("date", datetime.date(2022, 10, 6)),
+        ("time", datetime.time(18, 9, 1, 500)),
+        ("delta", datetime.timedelta(hours=1)),
+        ("uuid", uuid.UUID(int=1)),
+        ("lazy", gettext_lazy("Категория")),
+        ("nested", [{"id": 2, "items": (1, 2.5, None, True)}]),
+        (1, "ключ-число"),
+    ]
+)
+
+
+class TestORJSONRenderer:
+    def test_same_as_drf(self):
+        expected = JSONRenderer().render(DATA)
+        actual = ORJSONRenderer().render(DATA)
+
+        assert actual == expected, "Проверьте, что вывод совпадает с DRF"
+
+    def test_indent_fallback(self):
+        media_type = "application/json; indent=4"
+
+        assert ORJSONRenderer().render(
+            DATA, media_type
+        ) == JSONRenderer().render(DATA, media_type)
+
+    def test_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(renderers, "orjson", None)
+
+        assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+    def test_none(self):
+        assert ORJSONRenderer().render(None) == b""
+
+
+class TestORJSONParser:
+    body = '{"name": "Тест", "product": [{"id": 1, "price": 10}]}'
+
+    def test_parse(self):
+        stream = io.BytesIO(self.body.encode())
+
+        assert ORJSONParser().parse(stream) == JSONParser().parse(
+            io.BytesIO(self.body.encode())
+        )
+
+    @pytest.mark.parametrize("body", [b"{", b'{"price": NaN}'])
+    def test_parse_error(self, body):
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(body))
+
+    def test_other_encoding(self):
+        stream = io.BytesIO(self.body.encode("cp1251"))
+        parsed = ORJSONParser().parse(
+            stream, parser_context={"encoding": "cp1251"}
+        )
+
+        assert parsed["name"] == "Тест"
+
+    def test_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(parsers, "orjson", None)
+
+        assert ORJSONParser().parse(io.BytesIO(self.body.encode())) == {
+            "name": "Тест",
+            "product": [{"id": 1, "price": 10}],
+        }
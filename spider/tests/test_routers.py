@@ -0,0 +1,138 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from organizations.models import Category, Product
+from spider.routers import ReplicaRouter, is_pinned, pin_primary, use_replica
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ["replica_0", "replica_1"]
+    settings.DATABASE_REPLICA_LAG = 5
+    return settings.DATABASE_REPLICAS
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="TestUser", password="1234567")
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Запоминает базы, которые роутер выбрал для чтения."""
+    databases = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        database = db_for_read(self, model, **hints)
+        databases.append(database)
+        return database
+
+    monkeypatch.setattr(ReplicaRouter, "db_for_read", record)
+    return databases
+
+
+class TestReplicaRouter:
+    def test_read_opt_in(self, replicas):
+        router = ReplicaRouter()
+
+        assert (
+            router.db_for_read(Category) is None
+        ), "Проверьте, что без use_replica чтение идет в default"
+        token = use_replica.set(True)
+        try:
+            assert router.db_for_read(Category) in replicas
+        finally:
+            use_replica.reset(token)
+
+    def test_without_replicas(self, settings):
+        settings.DATABASE_REPLICAS = []
+        token = use_replica.set(True)
+        try:
+            assert ReplicaRouter().db_for_read(Category) is None
+        finally:
+            use_replica.reset(token)
+
+    def test_write_and_migrate(self, replicas):
+        router = ReplicaRouter()
+        token = use_replica.set(True)
+        try:
+            assert router.db_for_write(Category) == "default"
+        finally:
+            use_replica.reset(token)
+        assert router.allow_migrate("replica_0", "organizations") is False
+        assert router.allow_migrate("default", "organizations") is None
+
+    @pytest.mark.django_db
+    def test_pin(self, replicas, user):
+        assert not is_pinned(user)
+        pin_primary(user)
+        assert is_pinned(user), "Проверьте, что пользователь закрепляется"
+
+
+class TestReplicaViews:
+    url = "/categories/"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_from_replica(self, settings, user_client, routed):
+        # Реплика - это default под другим именем, чтобы запрос выполнился.
+        settings.DATABASE_REPLICAS = ["default"]
+        settings.DATABASE_REPLICA_LAG = 0
+        Category.objects.create(name="Категория")
+        response = user_client.get(self.url)
+
+        assert response.status_code == 200
+        assert routed == [
+            "default"
+        ], "Проверьте, что list справочника читается с реплики"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recent_change_reads_primary(
+        self, settings, user_client, routed
+    ):
+        settings.DATABASE_REPLICAS = ["default"]
+        settings.DATABASE_REPLICA_LAG = 60
+        Category.objects.create(name="Категория")
+        user_client.get(self.url)
+
+        assert routed == [
+            None
+        ], "Проверьте, что недавно измененный ресурс читается с default"
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writer_pinned(self, settings, user, user_client, routed):
+        settings.DATABASE_REPLICAS = ["default"]
+        settings.DATABASE_REPLICA_LAG = 60
+        category = Category.objects.create(name="Категория")
+        response = user_client.post(
+            "/products/",
+            {"name": "Товар", "category": category.pk},
+            format="json",
+        )
+
+        assert response.status_code == 201
+        assert is_pinned(user), (
+            "Проверьте, что запись через ProductSerializer закрепляет "
+            "пользователя за default"
+        )
+        settings.DATABASE_REPLICA_LAG = 0
+        routed.clear()
+        user_client.get(self.url)
+        assert set(routed) == {None}
+        assert Product.objects.exists()